@@ -34,6 +34,20 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from gun_checks.anomaly import anomalies
+from gun_checks.breakdown import breakdown, group_columns, type_shares
+from gun_checks.census import CENSUS_FACTS, FactCatalog, parse_census_values, population_table
+from gun_checks.correlate import correlation_table
+from gun_checks.cube import AggregateCube
+from gun_checks.figures import notebook_figures
+from gun_checks.nics import load_nics
+from gun_checks.population import per_capita_table
+from gun_checks.render import render_figures
+from gun_checks.report import build_report, notebook_sections
+from gun_checks.seasonal import decompose_cube
+from gun_checks.significance import significance_table
+from gun_checks.timeindex import TimeIndexedNics
+
 
 # In[2]:
 
@@ -265,6 +279,27 @@ df_nics.head()
 nics_clean = df_nics
 
 
+# Most of the analysis below looks at background check totals for a particular state, year or window of months. Rather than filtering and regrouping `nics_clean` for each of these, we will sum every count column once per state and month into an aggregate cube. Each total we need afterwards is then just a slice of the cube.
+
+# In[ ]:
+
+
+# Sum all NICS count columns per state and month, then per state and year
+monthly_cube = AggregateCube.from_frame(nics_clean, period='month')
+yearly_cube = monthly_cube.to_years()
+print('Monthly cube shape (states, months, columns):', monthly_cube.values.shape)
+print('Yearly cube shape (states, years, columns):', yearly_cube.values.shape)
+
+
+# When we need the rows themselves for a range of months, we will select them from a copy of `nics_clean` sorted by month and state. Because the rows are in time order, any window of months is a single contiguous slice that can be found with a binary search.
+
+# In[ ]:
+
+
+# Sort the NICS rows by month and state for selecting time windows
+nics_by_time = TimeIndexedNics(nics_clean)
+
+
 # In summary we have loaded the NICS data set and cleaned the data of null values, replacing them with the mean for each column. We have also created seperate month and year columns to efficiently stratefy the data based on date. 
 
 # ## Loading and Cleaning Census Data Set
@@ -356,17 +391,11 @@ df_census.drop('Fact Note', axis=1, inplace = True)
 # In[24]:
 
 
-# Drop rows that won't be used in the analysis by creating and concatenating data frame slices, 
-# then reassign to df_census
-
-
-df_census = pd.concat(
-    [df_census.head(3), 
-     df_census.iloc[34:36], 
-     df_census.iloc[38:40],
-     df_census.iloc[47:51], 
-     df_census.iloc[62:64]]
-)
+# Drop rows that won't be used in the analysis by looking up each fact we need by its label,
+# then replace the long Fact text with the short column name it is stored under in CENSUS_FACTS
+census_catalog = FactCatalog(df_census)
+df_census = df_census.loc[[census_catalog.row(key) for key in CENSUS_FACTS]].copy()
+df_census['Fact'] = list(CENSUS_FACTS)
 
 
 # In[25]:
@@ -430,17 +459,17 @@ states = ['alabama', 'alaska', 'arizona', 'arkansas', 'california',
           'vermont','virginia', 'washington', 'west virginia','wisconsin', 'wyoming']
 
 
-# I originally tried to remove all non-digit characters from the strings like '.', ',', '$', and '\%', but this removed the context of which percents were 50.0\% versus 5.0\% or .05\%. Instead I will remove the characters individually
+# I originally tried to remove all non-digit characters from the strings like '.', ',', '$', and '\%', but this removed the context of which percents were 50.0\% versus 5.0\% or .05\%. Instead I will remove only the ',', '\%' and '$' characters. `parse_census_values` does this for every state column in a single pass, records which unit (count, percent or currency) each value was written in, and flags census markers like "Z", "D" or "FN" that are not numbers.
 
 # In[31]:
 
 
 # Removing non-digit characters, then converting to floats
-for state in states:
-    df_census[state].replace(',','', regex=True, inplace=True)
-    df_census[state].replace('%','', regex=True, inplace=True)
-    df_census[state].replace('\$','', regex=True, inplace=True)
-    df_census[state] = pd.to_numeric(df_census[state], downcast='float', errors='ignore')
+census_values = parse_census_values(df_census[states])
+df_census[states] = census_values.values
+
+# List any census markers that could not be converted to numbers
+census_values.markers.stack()
 
 
 # In[32]:
@@ -507,28 +536,12 @@ census_transpose.rename(columns=lambda x: x.strip().replace(",", "_"), inplace=T
 census_transpose.columns
 
 
-# Now that the data has been properly reorganized, we can make the column labels less wordy and easier to work with.
+# Since the Fact text was replaced with the short names from `CENSUS_FACTS` when we selected the rows, the column labels are already easy to work with.
 
 # In[40]:
 
 
-# Rename columns to so they are easier to work with, and more self-explanatory
-census_transpose.columns = [
-    'state',
-    'population_2016',
-    'population_2010',
-    'percent_change_population',
-    'hs_diploma_percentage',
-    'bachelors_degree_percentage',
-    'total_employment_percentage',
-    'female_employment_percentage',
-    'median_income',
-    'income_per_capita',
-    'poverty_percentage',
-    'number_of_employers',
-    'population_density',
-    'land_area'    
-]
+# Verify the column names match the keys in CENSUS_FACTS
 census_transpose.head()
 
 
@@ -550,9 +563,12 @@ census_transpose.loc[29:42]
 # List all columns to be fixed
 columns_to_fix = [
     'percent_change_population',
+    'percent_over_65_2016',
+    'percent_over_65_2010',
     'female_employment_percentage', 
     'hs_diploma_percentage',
     'bachelors_degree_percentage',
+    'uninsured_percentage',
     'total_employment_percentage',
     'poverty_percentage'
 ]
@@ -700,15 +716,11 @@ plt.ylabel('Background Checks (Millions)')
 # In[53]:
 
 
-#Create three data frames to zoom in on the spikes in background checks 
-nics_1999_2000 = nics_clean.query('year >= "1999-01-01" & year <= "2000-12-31"')
-nics_2012 = nics_clean.query('year >= "2012-01-01" & year <= "2012-12-31"')
-nics_2015_2016 = nics_clean.query('year >= "2015-01-01" & year <= "2016-12-31"')
-
-# Extract the monthly data for each of the three data frames
-df_1999_2000 = nics_1999_2000.groupby('month')['totals'].sum()
-df_2012 = nics_2012.groupby('month')['totals'].sum()
-df_2015_2016 = nics_2015_2016.groupby('month')['totals'].sum()
+#Slice three windows of months out of the cube to zoom in on the spikes in background checks 
+# and extract the monthly totals for each of them
+df_1999_2000 = monthly_cube.window('1999-01-01', '2000-12-31').totals(by='month')
+df_2012 = monthly_cube.window('2012-01-01', '2012-12-31').totals(by='month')
+df_2015_2016 = monthly_cube.window('2015-01-01', '2016-12-31').totals(by='month')
 df_2015_2016.head()
 
 
@@ -747,6 +759,39 @@ plt.grid(True, which = 'both')
 
 # All of the spikes in the three time periods occur at the end of year. There also is a smaller, but noticeable increase in background checks in the first three months of the year. Notably, the beginning of the year peak is much larger in 2016, and does not feature the brief cooling off period like 1999. 
 
+# To check this seasonal pattern beyond these three windows, we decompose the monthly checks of every state, and of the country as a whole, into a trend (a centered 12-month moving average), a seasonal part (the average deviation from the trend in each calendar month) and a residual. All of the series are decomposed together.
+
+# In[ ]:
+
+
+# Decompose the 1999-2016 monthly checks of all states and the national total at once
+seasonality = decompose_cube(monthly_cube.window('1999-01-01', '2016-12-31'))
+
+# Average deviation from the trend in each calendar month, nationally
+seasonality.factors.loc['united states'].plot(kind='bar')
+plt.title('Seasonal Component of Monthly Background Checks (1999-2016)')
+plt.xlabel('Calendar Month')
+plt.ylabel('Background Checks Above / Below Trend')
+
+
+# In[ ]:
+
+
+# States with the strongest seasonal swing (largest minus smallest monthly factor, relative to the mean trend)
+seasonal_swing = (seasonality.factors.max(axis=1) - seasonality.factors.min(axis=1)) / seasonality.trend.mean(axis=1)
+seasonal_swing.sort_values(ascending=False).head()
+
+
+# Instead of choosing the spike windows by eye, we can flag them automatically. Each state-month is compared with the same state's previous 24 months: how far it is from their median, measured in (scaled) median absolute deviations. Unlike a mean and standard deviation, the median and MAD are not pulled up by the spikes themselves. Months scoring above 3.5 are flagged.
+
+# In[ ]:
+
+
+# Flag anomalous state-months, then count how many states spiked in each month
+spikes = anomalies(monthly_cube)
+spikes.groupby('month').size().sort_values(ascending=False).head(10)
+
+
 # Surprisingly, the spike in background checks in 1999 does track with some large/well known mass shootings, specifically the July Atlanta day trading shooting which killed and injured a total of 23 people. Every following month there after there was one mass shooting injuring or kiilling at least 5 people including the Woodward Baptist shooting in September of 1999. It is possible that in light of deadly mass shootings Americans are more likely to acquire guns as a means of protection.
 # 
 # The Sandy Hook School Shooting takes place right in between the dramatic end of year rise in background checks for 2012. It is possible that the sustained in increase seen at the end of 2012 was exacerbated by the Sandy Hook shooting. The increase begins in mid-September, increases in pace in mid October, and increases the rise once again in mid November.
@@ -781,8 +826,9 @@ plt.grid(True, which = 'both')
 # In[58]:
 
 
-# Query the NICS database to determine what data was collected for 1998
-df_98 = nics_clean.query('year < "1999-01-01"')
+# Find which years have fewer than 12 months of data, then check what data was collected for 1998
+print('Years with partial data:', nics_by_time.partial_years())
+df_98 = nics_by_time.window(None, 1998)
 print ('Data Collected for 1998:', df_98['month'].unique())
 print('Data was only collected for November and December 1998')
 
@@ -790,8 +836,8 @@ print('Data was only collected for November and December 1998')
 # In[59]:
 
 
-# Query the NICS database to determine what data was collected for 2017
-df_17 = nics_clean.query('year >= "2017-01-01"')
+# Check what data was collected for 2017
+df_17 = nics_by_time.window(2017, None)
 print('Data Collected for 2017:', df_17['month'].unique())
 print('Data was only collected for January to September 2017')
 
@@ -801,8 +847,8 @@ print('Data was only collected for January to September 2017')
 # In[60]:
 
 
-# Creating new dataset with the timeframe we want to keep, and check the shape
-df_1999_2016 = nics_clean.query('year > "1998-12-31" & year <= "2016-12-31"')
+# Creating new dataset with the complete years we want to keep (1999-2016), and check the shape
+df_1999_2016 = nics_by_time.complete_years()
 df_1999_2016.shape
 
 
@@ -833,6 +879,28 @@ plt.grid(True, which = 'both')
 # 
 # In January 2008 the Bush administration enacted the National Instant Criminal Background Check Improvement Act whichh required gun background checks to screen for legally declared mentally ill purchasers. This may support the increase in background checks at the time. Perhaps in 2009-2010 the decrease could be attributed to a diversion of would-be purchasers to attempt to purchase a gun. 
 
+# ### Background Checks by Gun Type
+# 
+# So far we have only looked at the `totals` column. To see which types of guns are checked most often, we sum every count column per year in a single pass, group the columns by gun type (handgun, long gun, other, across sales, pawn, redemption, rental, return and private sale checks) and compute each type's share of the checks, as well as the share of private sales among all sales.
+# 
+# The mean values we filled in for missing data would count private sale, return and rental checks for the years before NICS collected them. So here we build the cube from the NICS data as reported, where missing counts are left out of the sums, rather than from `nics_clean`.
+
+# In[ ]:
+
+
+# All count columns summed per year (1999-2016) without the filled-in means, grouped by gun type
+reported_yearly_cube = AggregateCube.from_frame(load_nics('Database_Ncis_and_Census_data/gun_data.csv'), period='year')
+checks_by_column = breakdown(reported_yearly_cube.window(1999, 2016), by='year')
+group_columns(checks_by_column)
+
+
+# In[ ]:
+
+
+# Share of each gun type and of private sales for every year
+type_shares(checks_by_column)
+
+
 # ### Exploratory Analysis - Census Data Set
 
 # Now that we have explored the NICS dataset we will do the same for the Census data set. 
@@ -867,12 +935,10 @@ nics_clean.head()
 # In[121]:
 
 
-# Create 2010 and 2016 datasets from NICS dataset
-temp_nics_2010 = nics_clean.query('year == "2010-01-01"')
-nics_2010 = temp_nics_2010.groupby('state')['totals'].sum().reset_index()
+# Create 2010 and 2016 datasets from the yearly cube
+nics_2010 = yearly_cube.window(2010, 2010).totals(by='state').reset_index()
 
-temp_nics_2016 = nics_clean.query('year == "2016-01-01"')
-nics_2016 = temp_nics_2016.groupby('state')['totals'].sum().reset_index()
+nics_2016 = yearly_cube.window(2016, 2016).totals(by='state').reset_index()
 
 # Verify the data was obtained correctly
 nics_2016.head()
@@ -927,6 +993,37 @@ nics_demographics['gun_checks_per_capita_2016'] =  nics_demographics['gun_checks
 nics_demographics.head()
 
 
+# The census only gives populations for 2010 and 2016. To compare gun checks per capita in any other year, we estimate each state's population assuming it grew at a constant rate between (and beyond) those two years. This gives a state by year table of gun checks per capita, and the 2010 and 2016 columns match the values above.
+
+# In[ ]:
+
+
+# Gun checks per capita for every state and year, using interpolated populations
+per_capita_by_year = per_capita_table(yearly_cube, population_table(census_clean))
+per_capita_by_year.loc[:, 1999:2016].head()
+
+
+# Before looking at individual demographic variables, we will compute the correlation coefficient between every numeric census column and every gun check column (total and per capita, for each year) in one pass. The result is a table with one row per pair, which we will refer back to throughout the analysis below.
+
+# In[ ]:
+
+
+# Correlate every census feature with gun checks and gun checks per capita for every year
+correlations = correlation_table(nics_demographics)
+correlation_matrix = correlations.pivot(index='feature', columns='target', values='r')
+correlation_matrix
+
+
+# With only 50 states, a correlation coefficient on its own can't tell us whether a relationship is likely to be real or just noise. For every pair in the table we will also estimate a 95% confidence interval by bootstrapping the states, and a p-value by randomly permuting the gun check values 10,000 times.
+
+# In[ ]:
+
+
+# Add bootstrap confidence intervals and permutation p-values to every correlation
+correlation_significance = significance_table(nics_demographics, resamples=10000)
+correlation_significance.sort_values('p_value').head(10)
+
+
 # In[127]:
 
 
@@ -960,9 +1057,8 @@ nics_demographics[['state', 'female_employment_percentage']].plot.bar(x = 'state
 # In[130]:
 
 
-# Calculate Correlation Coefficient for female employment vs. gun checks in 2010 and 2016
-correlation_2010 = nics_demographics['female_employment_percentage'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['female_employment_percentage'].corr(nics_demographics['gun_checks_2016'])
+# Look up the Correlation Coefficient for female employment vs. gun checks in 2010 and 2016
+correlation_2010, correlation_2016 = correlation_matrix.loc['female_employment_percentage', ['gun_checks_2010', 'gun_checks_2016']]
 print(
 f'''
 2010 Female Employment Correlation Coefficient: {correlation_2010} 
@@ -1044,9 +1140,8 @@ plt.show()
 # In[135]:
 
 
-# Calculate Correlation Coefficients for Median Income vs. gun checks
-correlation_2010 = nics_demographics['median_income'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['median_income'].corr(nics_demographics['gun_checks_2016'])
+# Look up the Correlation Coefficients for Median Income vs. gun checks
+correlation_2010, correlation_2016 = correlation_matrix.loc['median_income', ['gun_checks_2010', 'gun_checks_2016']]
 print(
 f'''
 2010 Median Income Correlation Coefficient: {correlation_2010} 
@@ -1092,9 +1187,8 @@ plt.legend(fontsize = 15)
 # In[138]:
 
 
-# Calculate Correlation Coefficients for Income per Capita vs. gun checks
-correlation_2010 = nics_demographics['income_per_capita'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['income_per_capita'].corr(nics_demographics['gun_checks_2016'])
+# Look up the Correlation Coefficients for Income per Capita vs. gun checks
+correlation_2010, correlation_2016 = correlation_matrix.loc['income_per_capita', ['gun_checks_2010', 'gun_checks_2016']]
 print(
 f'''
 2010 Income per Capita Correlation Coefficient: {correlation_2010} 
@@ -1145,9 +1239,9 @@ plt.show()
 # In[ ]:
 
 
-# Calculate Correlation Coefficients for Percentage of Seniors vs. Gun Checks
-correlation_2010 = nics_demographics['percent_over_65_2010'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['percent_over_65_2016'].corr(nics_demographics['gun_checks_2016'])
+# Look up the Correlation Coefficients for Percentage of Seniors vs. Gun Checks
+correlation_2010 = correlation_matrix.loc['percent_over_65_2010', 'gun_checks_2010']
+correlation_2016 = correlation_matrix.loc['percent_over_65_2016', 'gun_checks_2016']
 print(
 f'''
 2010 Senior Population Correlation Coefficient: {correlation_2010} 
@@ -1195,8 +1289,7 @@ plt.show()
 
 
 # Find correlation coefficient for high school diplomas vs. gun checks per capita
-correlation_2010 = nics_demographics['hs_diploma_percentage'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['hs_diploma_percentage'].corr(nics_demographics['gun_checks_2016'])
+correlation_2010, correlation_2016 = correlation_matrix.loc['hs_diploma_percentage', ['gun_checks_2010', 'gun_checks_2016']]
 print(
 f'''
 2010 Rate of High School Diplomas Correlation Coefficient: {correlation_2010} 
@@ -1227,8 +1320,7 @@ plt.show()
 
 
 # Find correlation coefficient for high school diplomas vs. gun checks per capita
-correlation_2010 = nics_demographics['bachelors_degree_percentage'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['bachelors_degree_percentage'].corr(nics_demographics['gun_checks_2016'])
+correlation_2010, correlation_2016 = correlation_matrix.loc['bachelors_degree_percentage', ['gun_checks_2010', 'gun_checks_2016']]
 print(
 f'''
 2010 Rate of Bachelors Degrees Correlation Coefficient: {correlation_2010} 
@@ -1273,8 +1365,7 @@ plt.show()
 
 # Find correlation coefficient for uninsured population vs. gun checks per capita
 
-correlation_2010 = nics_demographics['uninsured_percentage'].corr(nics_demographics['gun_checks_2010'])
-correlation_2016 = nics_demographics['uninsured_percentage'].corr(nics_demographics['gun_checks_2016'])
+correlation_2010, correlation_2016 = correlation_matrix.loc['uninsured_percentage', ['gun_checks_2010', 'gun_checks_2016']]
 print(
 f'''
 2010 Uninsured population Correlation Coefficient: {correlation_2010} 
@@ -1306,6 +1397,11 @@ f'''
 # In[ ]:
 
 
-# Running this cell will execute a bash command to convert this notebook to an .html file
-get_ipython().system('python -m nbconvert --to html Investigate_a_Dataset.ipynb')
+# Running this cell will render the figures and build an .html report from the tables computed above,
+# without re-running the notebook. Only figures and sections whose inputs changed are redrawn.
+figure_paths, _ = render_figures(notebook_figures(nics_clean, census_clean, nics_demographics))
+report_path, _ = build_report(
+    notebook_sections(nics_clean, census_clean, nics_demographics, correlation_significance, figure_paths)
+)
+print('Report written to', report_path)
 
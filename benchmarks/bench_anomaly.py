@@ -0,0 +1,94 @@
+"""Check batch and streaming spike detection against pandas and time them.
+
+Run from the repository root:
+
+    python benchmarks/bench_anomaly.py --copies 100
+
+Each state's trailing median and MAD are recomputed one series at a time
+with pandas rolling windows, and the batch robust z-scores must match them.
+A ``StreamingDetector`` fed one month at a time must reproduce the batch
+scores exactly, and ``release_alerts`` for the last months must return the
+same rows (and dtypes) as ``anomalies``. The timings use the states repeated
+``--copies`` times.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from gun_checks.anomaly import (DEFAULT_WINDOW, MAD_SCALE, StreamingDetector, anomalies,  # noqa: E402
+                                release_alerts, robust_zscores)
+from gun_checks.cube import AggregateCube  # noqa: E402
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+
+
+def pandas_zscores(values, window):
+    """Score each row of ``values`` separately with pandas rolling windows."""
+    scores = []
+    for row in values:
+        series = pd.Series(row)
+        history = series.rolling(window)
+        median = history.median()
+        mad = MAD_SCALE * history.apply(lambda months: np.median(np.abs(months - np.median(months))), raw=True)
+        scores.append(((series - median.shift(1)) / mad.shift(1)).to_numpy())
+    return np.array(scores)
+
+
+def streamed_zscores(values, window):
+    detector = StreamingDetector(range(len(values)), window)
+    return np.column_stack([detector.update(values[:, month])[0] for month in range(values.shape[1])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW)
+    parser.add_argument('--latest', type=int, default=6, help='months scored by release_alerts')
+    parser.add_argument('--copies', type=int, default=100, help='times to repeat the states for timing')
+    args = parser.parse_args()
+
+    cube = AggregateCube.from_frame(load_nics(args.csv, cache_dir=None))
+    values = cube.column('totals').astype(np.float64)
+
+    scores, _ = robust_zscores(values, args.window)
+    expected = pandas_zscores(values, args.window)
+    known = ~np.isnan(expected)
+    np.testing.assert_allclose(scores[known], expected[known], rtol=1e-9)
+    assert np.isnan(scores[:, :args.window]).all(), 'months without a full window must be NaN'
+    # pandas turns 0 / 0 (no change against a flat window) into NaN; the batch scores make it 0
+    flat = ~known
+    flat[:, :args.window] = False
+    assert (scores[flat] == 0).all(), 'no change against a flat window must score 0'
+    print('batch z-scores match pandas for {} series x {} months'.format(*values.shape))
+
+    np.testing.assert_array_equal(streamed_zscores(values, args.window), scores)
+    months = list(cube.periods[-args.latest:])
+    batch = anomalies(cube, window=args.window)
+    batch = batch[batch['month'] >= months[0]].sort_values(['month', 'state']).reset_index(drop=True)
+    streamed = release_alerts(cube, months, window=args.window)
+    streamed = streamed.sort_values(['month', 'state']).reset_index(drop=True)
+    pd.testing.assert_frame_equal(batch, streamed)
+    print('streaming scores and release alerts match batch mode')
+
+    scaled = np.tile(values, (args.copies, 1))
+    start = time.perf_counter()
+    robust_zscores(scaled, args.window)
+    batch_time = time.perf_counter() - start
+    detector = StreamingDetector(range(len(scaled)), args.window)
+    for month in range(args.window):
+        detector.update(scaled[:, month])
+    start = time.perf_counter()
+    detector.update(scaled[:, args.window])
+    month_time = time.perf_counter() - start
+    print('{} series: batch {:8.1f} ms, one streamed month {:8.2f} ms'.format(
+        len(scaled), batch_time * 1000, month_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Compare cold (csv parse + clean) and warm (binary cache) NICS load times.
+
+Run from the repository root:
+
+    python benchmarks/bench_nics_cache.py --repeat 5
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+
+
+def time_call(func, repeat):
+    """Return the best wall time of ``repeat`` calls to ``func``."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='nics-bench-')
+    try:
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            load_nics(args.csv, cache_dir=cache_dir)
+
+        def warm():
+            load_nics(args.csv, cache_dir=cache_dir)
+
+        cold_time = time_call(cold, args.repeat)
+        warm_time = time_call(warm, args.repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print('cold load (parse + clean + write cache): {:8.1f} ms'.format(cold_time * 1000))
+    print('warm load (binary cache):                {:8.1f} ms'.format(warm_time * 1000))
+    print('speed-up:                                {:8.1f}x'.format(cold_time / warm_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Report NICS frame memory with the notebook's dtypes vs the declared schema.
+
+Run from the repository root:
+
+    python benchmarks/bench_schema.py
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from gun_checks.nics import NICS_CSV, NON_US_STATES, load_nics  # noqa: E402
+from gun_checks.schema import memory_report  # noqa: E402
+
+
+def notebook_clean(path):
+    """Clean the NICS csv exactly as the notebook cells do."""
+    df_nics = pd.read_csv(path)
+    df_nics.fillna(df_nics.mean(numeric_only=True), axis=0, inplace=True)
+    df_nics = df_nics.query('state not in @NON_US_STATES').copy()
+    df_nics['month'] = pd.to_datetime(df_nics['month'])
+    df_nics['year'] = pd.to_datetime(df_nics['month'].dt.year, format='%Y')
+    df_nics['state'] = df_nics['state'].str.lower()
+    return df_nics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    args = parser.parse_args()
+
+    report = memory_report(notebook_clean(args.csv), load_nics(args.csv, cache_dir=None))
+    with pd.option_context('display.max_rows', None):
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
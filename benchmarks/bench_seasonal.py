@@ -0,0 +1,78 @@
+"""Check the vectorized seasonal decomposition against pandas and time it.
+
+Run from the repository root:
+
+    python benchmarks/bench_seasonal.py --copies 200
+
+Every state's monthly totals are decomposed one series at a time with
+pandas (a centered 2 x 12 rolling mean and a groupby over calendar months)
+and the result must match ``decompose`` on the whole state x month matrix,
+for both models. The timings then compare both paths on the states repeated
+``--copies`` times.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from gun_checks.cube import AggregateCube  # noqa: E402
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+from gun_checks.seasonal import MODELS, decompose  # noqa: E402
+
+
+def pandas_decompose(values, phases, model):
+    """Decompose each row of ``values`` separately with pandas."""
+    trends, factors = [], []
+    for row in values:
+        series = pd.Series(row)
+        # Mean of months t-6..t+5 and t-5..t+6, i.e. the centered 2 x 12 average
+        trend = series.rolling(12, center=True).mean().rolling(2).mean().shift(-1)
+        detrended = series - trend if model == 'additive' else series / trend
+        factor = detrended.groupby(phases).mean()
+        factor = factor - factor.mean() if model == 'additive' else factor / factor.mean()
+        trends.append(trend.to_numpy())
+        factors.append(factor.to_numpy())
+    return np.array(trends), np.array(factors)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--copies', type=int, default=100, help='times to repeat the states for timing')
+    args = parser.parse_args()
+
+    cube = AggregateCube.from_frame(load_nics(args.csv, cache_dir=None))
+    values = cube.column('totals').astype(np.float64)
+    phases = np.asarray(cube.periods.month) - 1
+
+    for model in MODELS:
+        parts = decompose(values, phases, 12, model)
+        trend, factors = pandas_decompose(values, phases, model)
+        np.testing.assert_allclose(parts.trend, trend, rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(parts.factors, factors, rtol=1e-9)
+        combined = parts.trend + parts.seasonal + parts.resid if model == 'additive' else \
+            parts.trend * parts.seasonal * parts.resid
+        np.testing.assert_allclose(combined, np.where(np.isnan(trend), np.nan, values), rtol=1e-9)
+    print('decompose matches pandas for {} series x {} months'.format(*values.shape))
+
+    scaled = np.tile(values, (args.copies, 1))
+    _, vectorized = timed(decompose, scaled, phases)
+    _, looped = timed(pandas_decompose, scaled, phases, 'additive')
+    print('{} series: decompose {:8.1f} ms, pandas per series {:8.1f} ms'.format(
+        len(scaled), vectorized * 1000, looped * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Check the SQL aggregation backends against pandas and time all of them.
+
+Run from the repository root:
+
+    python benchmarks/bench_sql.py --threads 4
+
+Each backend must produce exactly the monthly and yearly cubes of the pandas
+path. duckdb is skipped when it is not installed. The sqlite time includes
+copying the csv into its database on the first run only.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from gun_checks.cube import AggregateCube  # noqa: E402
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+from gun_checks.sql import SQL_ENGINES, aggregate_sql  # noqa: E402
+
+
+def assert_same_cube(expected, actual):
+    assert expected.states.equals(actual.states), 'states differ'
+    assert expected.periods.equals(actual.periods), 'periods differ'
+    assert expected.columns.equals(actual.columns), 'columns differ'
+    assert np.array_equal(expected.values, actual.values), 'values differ'
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--threads', type=int, default=None, help='duckdb worker threads')
+    args = parser.parse_args()
+
+    expected, seconds = timed(lambda: AggregateCube.from_frame(load_nics(args.csv, cache_dir=None)))
+    print('{:<16} {:8.1f} ms'.format('pandas', seconds * 1000))
+    expected_years = expected.to_years()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for engine in SQL_ENGINES:
+            for run in ('first', 'second'):
+                try:
+                    actual, seconds = timed(aggregate_sql, args.csv, engine=engine, threads=args.threads,
+                                            cache_dir=cache_dir)
+                except ImportError as error:
+                    print('{:<16} skipped: {}'.format(engine, error))
+                    break
+                assert_same_cube(expected, actual)
+                print('{:<16} {:8.1f} ms'.format('{} ({})'.format(engine, run), seconds * 1000))
+            else:
+                years = aggregate_sql(args.csv, period='year', engine=engine, threads=args.threads,
+                                      cache_dir=cache_dir)
+                assert_same_cube(expected_years, years)
+    print('SQL backends match pandas')
+
+
+if __name__ == '__main__':
+    main()
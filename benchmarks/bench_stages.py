@@ -0,0 +1,172 @@
+"""Time and measure every wrangling and analysis stage at several input scales.
+
+The shipped csv files are scaled up by copying every state under a new name
+("Alabama 2", "Alabama 3", ...) in both the NICS and the census data, so a
+scale of 100 means 100 times as many states (and NICS rows) flowing through
+the same stages as the notebook. Each stage is timed on its own (best of
+``--repeat`` untraced runs) and run once more under tracemalloc for its peak
+memory.
+
+Run from the repository root:
+
+    python benchmarks/bench_stages.py --scales 1 10 100 --save-baseline
+    python benchmarks/bench_stages.py --scales 1 10 100
+
+The second call compares against ``benchmarks/baseline.json`` and exits with
+status 1 if any stage got slower (or used more memory) than ``--tolerance``
+times the baseline. Baselines are machine specific; record one per machine.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from gun_checks.census import CENSUS_CSV, FactCatalog, facts_by_state, population_table  # noqa: E402
+from gun_checks.correlate import correlation_table  # noqa: E402
+from gun_checks.cube import AggregateCube  # noqa: E402
+from gun_checks.demographics import merge_demographics  # noqa: E402
+from gun_checks.nics import NICS_CSV, NON_US_STATES, drop_non_states, normalize_nics  # noqa: E402
+from gun_checks.population import per_capita_table  # noqa: E402
+from gun_checks.schema import READ_DTYPES, apply_schema, month_periods  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def scale_inputs(nics_csv, census_csv, scale, out_dir):
+    """Write ``scale`` state-copies of both csv files to ``out_dir``."""
+    nics = pd.read_csv(nics_csv, dtype=str)
+    states = nics[~nics['state'].isin(NON_US_STATES)]
+    nics_path = os.path.join(out_dir, 'gun_data.csv')
+    nics.to_csv(nics_path, index=False)
+    for copy in range(2, scale + 1):
+        states.assign(state=states['state'] + ' {}'.format(copy)).to_csv(
+            nics_path, index=False, header=False, mode='a')
+
+    census = pd.read_csv(census_csv, dtype=str)
+    state_columns = [column for column in census.columns if column.lower() not in ('fact', 'fact note')]
+    copies = [census[state_columns].add_suffix(' {}'.format(copy)) for copy in range(2, scale + 1)]
+    census_path = os.path.join(out_dir, 'US_Census_Data.csv')
+    pd.concat([census] + copies, axis=1).to_csv(census_path, index=False)
+    return nics_path, census_path
+
+
+def notebook_fillna(df_nics):
+    df_nics = df_nics.copy()
+    df_nics.fillna(df_nics.mean(numeric_only=True), axis=0, inplace=True)
+    return df_nics
+
+
+def stages(nics_path, census_path):
+    """Return ``(name, func, input names)`` for each stage, in run order.
+
+    Together the stages are ``clean_nics`` and ``FactCatalog.select`` split
+    into their separate operations, each timed on its own.
+    """
+    return [
+        ('nics_parse', lambda: pd.read_csv(nics_path, dtype=READ_DTYPES), ()),
+        ('fillna', notebook_fillna, ('nics_parse',)),
+        ('datetime', lambda nics: month_periods(nics['month']), ('nics_parse',)),
+        # apply_schema skips the month column, already converted above
+        ('count_casts', lambda nics, months: apply_schema(nics.assign(month=months)),
+         ('nics_parse', 'datetime')),
+        ('state_filter', drop_non_states, ('count_casts',)),
+        ('state_names', normalize_nics, ('state_filter',)),
+        ('aggregate', lambda nics: AggregateCube.from_frame(nics).to_years(), ('state_names',)),
+        ('census_parse', lambda: pd.read_csv(census_path), ()),
+        ('census_values', lambda census: FactCatalog(census).fact_values(), ('census_parse',)),
+        ('transpose', facts_by_state, ('census_values',)),
+        ('merge', merge_demographics, ('aggregate', 'transpose')),
+        ('per_capita', lambda yearly, census: per_capita_table(yearly, population_table(census)),
+         ('aggregate', 'transpose')),
+        ('correlations', correlation_table, ('merge',)),
+    ]
+
+
+def measure(func, args, repeat):
+    """Return ``(result, best seconds, peak MiB)`` for ``func(*args)``."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def run_scale(nics_csv, census_csv, scale, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        nics_path, census_path = scale_inputs(nics_csv, census_csv, scale, tmp_dir)
+        outputs = {}
+        for name, func, inputs in stages(nics_path, census_path):
+            outputs[name], seconds, peak = measure(func, [outputs[dep] for dep in inputs], repeat)
+            results[name] = {'seconds': seconds, 'peak_mib': peak}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print each stage against ``baseline`` and return the number of regressions."""
+    regressions = 0
+    print('{:>6} {:<14} {:>10} {:>10} {:>8} {:>10} {:>10} {:>8}'.format(
+        'scale', 'stage', 'ms', 'base ms', 'ratio', 'MiB', 'base MiB', 'ratio'))
+    for scale, stage_results in results.items():
+        for name, result in stage_results.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                print('{:>6} {:<14} {:10.1f} {:>10} {:>8} {:10.1f}'.format(
+                    scale, name, result['seconds'] * 1000, '-', '-', result['peak_mib']))
+                continue
+            time_ratio = result['seconds'] / max(base['seconds'], 1e-9)
+            peak_ratio = result['peak_mib'] / max(base['peak_mib'], 1e-9)
+            regressed = time_ratio > tolerance or peak_ratio > tolerance
+            regressions += regressed
+            print('{:>6} {:<14} {:10.1f} {:10.1f} {:8.2f} {:10.1f} {:10.1f} {:8.2f}{}'.format(
+                scale, name, result['seconds'] * 1000, base['seconds'] * 1000, time_ratio,
+                result['peak_mib'], base['peak_mib'], peak_ratio, '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nics-csv', default=NICS_CSV)
+    parser.add_argument('--census-csv', default=CENSUS_CSV)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='input scale factors (1000 needs several GiB of disk and memory)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per stage (best is kept)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='overwrite the baseline with this run')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='flag stages slower or larger than this multiple of the baseline')
+    args = parser.parse_args()
+
+    results = {str(scale): run_scale(args.nics_csv, args.census_csv, scale, args.repeat)
+               for scale in args.scales}
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('baseline saved to {}'.format(args.baseline))
+    elif regressions:
+        print('{} stage(s) regressed'.format(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
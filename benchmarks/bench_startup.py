@@ -0,0 +1,59 @@
+"""Compare interpreter startup cost of the CLI with the notebook's imports.
+
+Each import statement is run in a fresh interpreter with ``-X importtime``
+and the cumulative import time of every top-level module is summed. Run
+from the repository root:
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('pandas + numpy', 'import pandas, numpy'),
+    ('CLI (python -m gun_checks)', 'import gun_checks.cli'),
+    ('notebook imports', 'import pandas, numpy, matplotlib.pyplot, seaborn; '
+                         'from IPython.core.display import HTML'),
+]
+
+
+def import_time(statement):
+    """Return ``(importtime total in seconds, wall seconds)`` for one fresh interpreter."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line.split('|')
+        name = parts[2]
+        cumulative = parts[1].strip()
+        # Only top-level entries (no indentation) so nested imports are not counted twice
+        if cumulative.isdigit() and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1e6, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for label, statement in CASES:
+        timings = [import_time(statement) for _ in range(args.repeat)]
+        imports = min(imports for imports, _ in timings)
+        wall = min(wall for _, wall in timings)
+        print('{:<28} imports {:7.3f} s   process {:7.3f} s'.format(label, imports, wall))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Time opening and slicing memory-mapped cube stores of different sizes.
+
+Run from the repository root:
+
+    python benchmarks/bench_store.py --history 1 10 100 --workers 4
+
+For each history length (the NICS months repeated that many times) the
+monthly cube is written as a store, reopened, and sliced by several worker
+processes at once. Each worker checks that its slice is a view of the
+memory-mapped file and that its sums match the in-memory cube.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from gun_checks.cube import AggregateCube  # noqa: E402
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+
+
+def longer_history(cube, repeat):
+    """Return ``cube`` with its months repeated ``repeat`` times back in time."""
+    if repeat == 1:
+        return cube
+    periods = pd.period_range(end=cube.periods[-1], periods=len(cube.periods) * repeat, freq='M',
+                              name=cube.period_name)
+    return AggregateCube(np.tile(cube.values, (1, repeat, 1)), cube.states, periods, cube.columns)
+
+
+def slice_store(job):
+    """Open the store in a worker and sum one state's last 24 months."""
+    directory, state = job
+    start = time.perf_counter()
+    store = AggregateCube.open_store(directory)
+    view = store.window(store.periods[-24], None).select(states=[state], columns=['handgun', 'long_gun'])
+    total = int(view.values.sum())
+    return total, np.shares_memory(view.values, store.values), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--history', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    monthly = AggregateCube.from_frame(load_nics(args.csv, cache_dir=None))
+    for repeat in args.history:
+        cube = longer_history(monthly, repeat)
+        with tempfile.TemporaryDirectory() as directory:
+            cube.save_store(directory)
+            start = time.perf_counter()
+            AggregateCube.open_store(directory)
+            open_ms = (time.perf_counter() - start) * 1000
+
+            states = list(cube.states[:args.workers])
+            expected = [int(cube.window(cube.periods[-24], None).select(states=[state],
+                                                                       columns=['handgun', 'long_gun'])
+                            .values.sum()) for state in states]
+            with ProcessPoolExecutor(args.workers) as executor:
+                results = list(executor.map(slice_store, [(directory, state) for state in states]))
+            assert [total for total, _, _ in results] == expected, 'worker sums differ'
+            assert all(shared for _, shared, _ in results), 'a worker slice was copied'
+            worker_ms = max(seconds for _, _, seconds in results) * 1000
+            print('{:>5}x history: {:8.1f} MiB on disk, open {:6.2f} ms, slowest worker open+slice {:6.2f} ms'
+                  .format(repeat, cube.values.nbytes / 2**20, open_ms, worker_ms))
+    print('worker slices are views and match the in-memory cube')
+
+
+if __name__ == '__main__':
+    main()
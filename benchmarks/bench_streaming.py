@@ -0,0 +1,62 @@
+"""Compare peak memory of the in-memory and streaming NICS trend paths.
+
+Run from the repository root:
+
+    python benchmarks/bench_streaming.py --chunksize 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+from gun_checks.streaming import permit_trends, stream_nics  # noqa: E402
+
+
+def in_memory(path):
+    nics_clean = load_nics(path, cache_dir=None)
+    monthly_permit_trends = nics_clean.groupby('month')['totals'].sum()
+    annual_permit_trends = nics_clean.groupby('year')['totals'].sum()
+    return monthly_permit_trends, annual_permit_trends
+
+
+def streaming(path, chunksize):
+    return permit_trends(stream_nics(path, chunksize=chunksize))
+
+
+def measure(func, *args):
+    """Return ``(result, seconds, peak MiB)`` for one call to ``func``."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    args = parser.parse_args()
+
+    expected, mem_time, mem_peak = measure(in_memory, args.csv)
+    actual, stream_time, stream_peak = measure(streaming, args.csv, args.chunksize)
+
+    for left, right in zip(expected, actual):
+        pd.testing.assert_series_equal(left, right, check_names=False, check_dtype=False)
+
+    print('in-memory: {:8.1f} ms  peak {:8.1f} MiB'.format(mem_time * 1000, mem_peak))
+    print('streaming: {:8.1f} ms  peak {:8.1f} MiB'.format(stream_time * 1000, stream_peak))
+    print('monthly/annual trends match')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Check the cumulative-sum window statistics against pandas and time them.
+
+Run from the repository root:
+
+    python benchmarks/bench_windows.py --copies 100
+
+Every spec of ``window_stats`` on the state x month totals must match the
+equivalent pandas ``rolling`` / ``shift`` / ``expanding`` result, and a
+``WindowStats`` primed with part of the history and fed the remaining
+months one at a time must reproduce the batch statistics exactly. The
+timings use the states repeated ``--copies`` times.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from gun_checks.cube import AggregateCube  # noqa: E402
+from gun_checks.nics import NICS_CSV, load_nics  # noqa: E402
+from gun_checks.windows import (DEFAULT_SPECS, EXPANDING_STATS, WindowStats, parse_spec,  # noqa: E402
+                                spec_name, window_stats)
+
+SPECS = DEFAULT_SPECS + tuple(EXPANDING_STATS) + ('sum:1', 'mean:24', 'ratio:1')
+
+
+def pandas_stat(frame, spec):
+    """Return ``spec`` of every column of the month x series ``frame`` with pandas."""
+    stat, months = parse_spec(spec)
+    if months is None:
+        return getattr(frame.expanding(), stat)()
+    if stat == 'ratio':
+        return frame / frame.shift(months)
+    return getattr(frame.rolling(months), stat)()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=NICS_CSV)
+    parser.add_argument('--copies', type=int, default=100, help='times to repeat the states for timing')
+    args = parser.parse_args()
+
+    cube = AggregateCube.from_frame(load_nics(args.csv, cache_dir=None))
+    values = cube.column('totals').astype(np.float64)
+    stats = window_stats(values, SPECS)
+    frame = pd.DataFrame(values.T)
+    for spec in SPECS:
+        expected = pandas_stat(frame, spec).to_numpy().T
+        np.testing.assert_allclose(stats[spec_name(spec)], expected, rtol=1e-12, equal_nan=True,
+                                   err_msg=spec)
+    print('{} specs match pandas for {} series x {} months'.format(len(SPECS), *values.shape))
+
+    for primed in (0, 1, 12, values.shape[1] // 2):
+        windows = WindowStats.from_matrix(range(len(values)), values[:, :primed], SPECS)
+        for month in range(primed, values.shape[1]):
+            for name, result in windows.append(values[:, month]).items():
+                np.testing.assert_array_equal(result, stats[name][:, month],
+                                              err_msg='{} at month {}'.format(name, month))
+    print('appended months match the batch statistics')
+
+    scaled = np.tile(values, (args.copies, 1))
+    start = time.perf_counter()
+    window_stats(scaled)
+    batch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scaled_frame = pd.DataFrame(scaled.T)
+    for spec in DEFAULT_SPECS:
+        pandas_stat(scaled_frame, spec)
+    pandas_time = time.perf_counter() - start
+    windows = WindowStats.from_matrix(range(len(scaled)), scaled[:, :-1])
+    start = time.perf_counter()
+    windows.append(scaled[:, -1])
+    append_time = time.perf_counter() - start
+    print('{} series, {} specs: window_stats {:8.1f} ms, pandas {:8.1f} ms, one append {:6.2f} ms'.format(
+        len(scaled), len(DEFAULT_SPECS), batch_time * 1000, pandas_time * 1000, append_time * 1000))
+
+
+if __name__ == '__main__':
+    main()
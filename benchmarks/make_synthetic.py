@@ -0,0 +1,31 @@
+"""Write synthetic gun_data.csv and US_Census_Data.csv files for load testing.
+
+Run from the repository root, e.g. for ten times the states over 40 years:
+
+    python benchmarks/make_synthetic.py synthetic --regions 550 --start 1985-04 --end 2025-08
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gun_checks.synthetic import NICS_AREAS, write_synthetic  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--start', default='1998-11', help='first month (YYYY-MM)')
+    parser.add_argument('--end', default='2017-09', help='last month (YYYY-MM)')
+    parser.add_argument('--regions', type=int, default=len(NICS_AREAS), help='number of states / areas')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for path in write_synthetic(args.out_dir, args.start, args.end, args.regions, args.seed):
+        print(path, os.path.getsize(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""Reusable data wrangling helpers for the NICS / Census analysis.
+
+The notebook export (Investigate_a_Dataset.py) walks through the cleaning
+steps one cell at a time; the modules in this package hold the same steps
+as plain functions so they can be cached and re-run outside of Jupyter.
+"""
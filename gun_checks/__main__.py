@@ -0,0 +1,3 @@
+from gun_checks.cli import main
+
+main()
@@ -0,0 +1,135 @@
+"""Spike detection on monthly check series with rolling robust z-scores.
+
+A month is scored against the ``window`` months before it: its distance
+from their median, divided by their median absolute deviation (MAD, scaled
+by 1.4826 to match a standard deviation for normal data). Median and MAD
+ignore the spikes they are meant to detect, unlike a mean and standard
+deviation, and a score above ``threshold`` (3.5 by default, the usual
+modified z-score cut-off) marks the month as anomalous.
+
+- ``robust_zscores`` scores the full history of every series at once, with
+  ``sliding_window_view`` turning the series x month matrix into a series x
+  month x window view without copying.
+- ``StreamingDetector`` keeps only the last ``window`` months per series in
+  a ring buffer, so scoring a new month costs the same however long the
+  history is. ``release_alerts`` primes one from a monthly cube and scores
+  just the newly published months, giving the same scores as batch mode.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+MAD_SCALE = 1.4826
+DEFAULT_WINDOW = 24
+DEFAULT_THRESHOLD = 3.5
+
+
+def _zscores(values, windows):
+    """Score ``values`` (..., ) against ``windows`` (..., window)."""
+    median = np.median(windows, axis=-1)
+    mad = MAD_SCALE * np.median(np.abs(windows - median[..., None]), axis=-1)
+    deviation = values - median
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # A flat window (MAD 0) makes any change infinitely surprising
+        scores = np.where(deviation == 0, 0.0, deviation / mad)
+    return scores, median
+
+
+def robust_zscores(values, window=DEFAULT_WINDOW):
+    """Return ``(scores, medians)`` for every month of a series x month matrix.
+
+    Month ``t`` is scored against months ``t - window`` to ``t - 1``; the
+    first ``window`` months have no full history and score NaN.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    scores = np.full(values.shape, np.nan)
+    medians = np.full(values.shape, np.nan)
+    if values.shape[1] > window:
+        windows = sliding_window_view(values, window, axis=1)[:, :-1]
+        scores[:, window:], medians[:, window:] = _zscores(values[:, window:], windows)
+    return scores, medians
+
+
+def _alert_frame(states, periods, values, scores, medians, threshold):
+    flagged = np.abs(scores) > threshold
+    rows, columns = np.nonzero(flagged)
+    return pd.DataFrame({
+        'state': pd.Index(states)[rows],
+        # An Index keeps the month dtype (period[M]) for one month or many
+        'month': pd.Index(periods)[columns],
+        'checks': values[rows, columns],
+        'median': medians[rows, columns],
+        'zscore': scores[rows, columns],
+    })
+
+
+def anomalies(cube, column='totals', window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+    """Return the anomalous state-months of a monthly cube, one row each."""
+    values = cube.column(column).astype(np.float64)
+    scores, medians = robust_zscores(values, window)
+    return _alert_frame(cube.states, cube.periods, values, scores, medians, threshold)
+
+
+class StreamingDetector:
+    """Score each new month of many series against their last ``window`` months."""
+
+    def __init__(self, states, window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+        self.states = pd.Index(states, name='state')
+        self.window = window
+        self.threshold = threshold
+        self.buffer = np.full((len(self.states), window), np.nan)
+        # Months seen so far, and the ring buffer slot the next month goes to
+        self.count = 0
+        self.position = 0
+
+    @classmethod
+    def from_cube(cls, cube, column='totals', window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+        """Return a detector that has seen the last ``window`` months of ``cube``."""
+        detector = cls(cube.states, window, threshold)
+        recent = cube.column(column)[:, -window:].astype(np.float64)
+        detector.buffer[:, :recent.shape[1]] = recent
+        detector.count = recent.shape[1]
+        detector.position = recent.shape[1] % window
+        return detector
+
+    def update(self, values):
+        """Score one month (a value per state) and add it to the history.
+
+        Returns ``(scores, medians)``; both are NaN until ``window`` months
+        have been seen.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self.count >= self.window:
+            scores, medians = _zscores(values, self.buffer)
+        else:
+            scores = medians = np.full(len(values), np.nan)
+        self.buffer[:, self.position] = values
+        self.position = (self.position + 1) % self.window
+        self.count += 1
+        return scores, medians
+
+    def alerts(self, month, values):
+        """Score ``month`` and return its anomalous states as a frame."""
+        scores, medians = self.update(values)
+        values = np.asarray(values, dtype=np.float64)
+        return _alert_frame(self.states, [month], values[:, None], scores[:, None], medians[:, None],
+                            self.threshold)
+
+
+def release_alerts(cube, months, column='totals', window=DEFAULT_WINDOW, threshold=DEFAULT_THRESHOLD):
+    """Return the anomalies among ``months``, the newest months of ``cube``.
+
+    Only the ``window`` months before the first new month and the new
+    months themselves are read, e.g. right after
+    ``IncrementalIngest.update`` returns the months it added.
+    """
+    first = cube.periods.get_loc(months[0])
+    if first:
+        history = cube.window(None, cube.periods[first - 1])
+        detector = StreamingDetector.from_cube(history, column, window, threshold)
+    else:
+        detector = StreamingDetector(cube.states, window, threshold)
+    values = cube.column(column)
+    frames = [detector.alerts(month, values[:, cube.periods.get_loc(month)]) for month in months]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,87 @@
+"""Background checks broken down by gun type and transaction.
+
+``breakdown`` sums every count column of an ``AggregateCube`` over the axes
+that are not kept in a single reduction of the cube's array, instead of one
+``groupby`` per column. ``group_columns`` then folds columns into gun types
+or transaction kinds with one matrix product, and ``type_shares`` derives
+the handgun / long gun / other and private sale / dealer ratios for every
+row at once.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Count columns of each gun type, across all transaction kinds
+GUN_TYPES = {
+    'handgun': ['handgun', 'prepawn_handgun', 'redemption_handgun', 'returned_handgun', 'rentals_handgun',
+                'private_sale_handgun', 'return_to_seller_handgun'],
+    'long_gun': ['long_gun', 'prepawn_long_gun', 'redemption_long_gun', 'returned_long_gun',
+                 'rentals_long_gun', 'private_sale_long_gun', 'return_to_seller_long_gun'],
+    'other': ['other', 'prepawn_other', 'redemption_other', 'returned_other', 'private_sale_other',
+              'return_to_seller_other'],
+}
+
+# Count columns of each kind of transaction
+TRANSACTIONS = {
+    'permit': ['permit', 'permit_recheck'],
+    'dealer_sale': ['handgun', 'long_gun', 'other', 'multiple'],
+    'admin': ['admin'],
+    'prepawn': ['prepawn_handgun', 'prepawn_long_gun', 'prepawn_other'],
+    'redemption': ['redemption_handgun', 'redemption_long_gun', 'redemption_other'],
+    'returned': ['returned_handgun', 'returned_long_gun', 'returned_other'],
+    'rentals': ['rentals_handgun', 'rentals_long_gun'],
+    'private_sale': ['private_sale_handgun', 'private_sale_long_gun', 'private_sale_other'],
+    'return_to_seller': ['return_to_seller_handgun', 'return_to_seller_long_gun', 'return_to_seller_other'],
+}
+
+
+def breakdown(cube, by='state'):
+    """Return every count column of ``cube`` summed per ``by``.
+
+    ``by`` is ``'state'``, the cube's period name (``'month'`` or
+    ``'year'``), both as a tuple (one row per state and period) or None for
+    a single row of grand totals.
+    """
+    values = cube.values
+    if by is None:
+        return pd.DataFrame(values.sum(axis=(0, 1))[None, :], columns=cube.columns)
+    if by == 'state':
+        return pd.DataFrame(values.sum(axis=1), index=cube.states, columns=cube.columns)
+    if by == cube.period_name:
+        return pd.DataFrame(values.sum(axis=0), index=cube.periods, columns=cube.columns)
+    if tuple(by) == ('state', cube.period_name):
+        index = pd.MultiIndex.from_product([cube.states, cube.periods])
+        return pd.DataFrame(values.reshape(-1, values.shape[2]), index=index, columns=cube.columns)
+    raise ValueError('by must be None, "state", {0!r} or ("state", {0!r})'.format(cube.period_name))
+
+
+def group_columns(counts, groups=GUN_TYPES):
+    """Return ``counts`` with its columns summed into ``groups``.
+
+    ``groups`` maps a group name to its count columns (see
+    :data:`GUN_TYPES` and :data:`TRANSACTIONS`); columns missing from
+    ``counts`` are ignored.
+    """
+    membership = np.zeros((len(counts.columns), len(groups)))
+    for position, columns in enumerate(groups.values()):
+        membership[counts.columns.get_indexer(counts.columns.intersection(columns)), position] = 1
+    return pd.DataFrame(counts.to_numpy(dtype=np.float64) @ membership, index=counts.index,
+                        columns=list(groups))
+
+
+def type_shares(counts):
+    """Return the gun type and private sale shares of each row of ``counts``.
+
+    ``handgun_share``, ``long_gun_share`` and ``other_share`` divide each
+    gun type (see :data:`GUN_TYPES`) by all three, and
+    ``private_sale_share`` divides private sale checks by private sale plus
+    dealer sale checks. Rows without any checks get NaN.
+    """
+    types = group_columns(counts, GUN_TYPES)
+    sales = group_columns(counts, {key: TRANSACTIONS[key] for key in ('private_sale', 'dealer_sale')})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = types.to_numpy() / types.to_numpy().sum(axis=1, keepdims=True)
+        private = sales['private_sale'].to_numpy() / sales.to_numpy().sum(axis=1)
+    result = pd.DataFrame(shares, index=counts.index, columns=[name + '_share' for name in types.columns])
+    result['private_sale_share'] = private
+    return result
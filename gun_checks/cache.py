@@ -0,0 +1,107 @@
+"""Content-addressed on-disk cache for cleaned data frames.
+
+Frames are stored column by column in an uncompressed ``.npz`` archive so a
+warm load is a handful of ``np.load`` calls instead of a CSV parse.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# Nullable extension arrays stored as values plus a missing-value mask
+MASKED_ARRAYS = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of the file at ``path``."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_frame(df, path):
+    """Write ``df`` to ``path`` as a columnar ``.npz`` archive.
+
+    Categorical and string columns are dictionary encoded (codes + unique
+    values, with code -1 for missing strings), periods are stored as their
+    integer ordinals, nullable (masked) integer, float and boolean columns as
+    a values array plus a missing-value mask and every other column as its
+    NumPy representation. A ``RangeIndex`` is stored as its bounds. The file
+    is written atomically.
+    """
+    arrays = {'__columns__': np.array(df.columns, dtype=str)}
+    if isinstance(df.index, pd.RangeIndex):
+        arrays['__range__'] = np.array([df.index.start, df.index.stop, df.index.step])
+    else:
+        arrays['__index__'] = df.index.to_numpy()
+    kinds = []
+    for i, name in enumerate(df.columns):
+        col = df[name]
+        key = 'c{}'.format(i)
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            kinds.append('category')
+            arrays[key] = col.cat.codes.to_numpy()
+            arrays[key + '_values'] = np.asarray(col.cat.categories, dtype=str)
+        elif isinstance(col.dtype, pd.PeriodDtype):
+            kinds.append('period')
+            arrays[key] = col.array.asi8
+            arrays[key + '_dtype'] = np.array(str(col.dtype))
+        elif isinstance(col.array, MASKED_ARRAYS):
+            kinds.append('masked')
+            arrays[key] = col.to_numpy(dtype=col.dtype.numpy_dtype, na_value=0)
+            arrays[key + '_mask'] = col.isna().to_numpy()
+            arrays[key + '_dtype'] = np.array(str(col.dtype))
+        elif pd.api.types.is_datetime64_any_dtype(col):
+            kinds.append('datetime')
+            arrays[key] = col.to_numpy()
+        elif pd.api.types.is_numeric_dtype(col):
+            kinds.append('numeric')
+            arrays[key] = col.to_numpy()
+        else:
+            kinds.append('string')
+            codes, uniques = pd.factorize(col)
+            arrays[key] = codes.astype(np.int32)
+            arrays[key + '_values'] = np.asarray(uniques, dtype=str)
+            arrays[key + '_dtype'] = np.array(str(col.dtype))
+    arrays['__kinds__'] = np.array(kinds, dtype=str)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_frame(path):
+    """Read a frame written by :func:`save_frame`."""
+    with np.load(path) as archive:
+        columns = archive['__columns__'].tolist()
+        kinds = archive['__kinds__'].tolist()
+        data = {}
+        for i, (name, kind) in enumerate(zip(columns, kinds)):
+            key = 'c{}'.format(i)
+            if kind == 'category':
+                categories = archive[key + '_values'].astype(object)
+                data[name] = pd.Categorical.from_codes(archive[key], categories)
+            elif kind == 'period':
+                dtype = pd.api.types.pandas_dtype(str(archive[key + '_dtype']))
+                data[name] = pd.arrays.PeriodArray(archive[key], dtype=dtype)
+            elif kind == 'masked':
+                dtype = pd.api.types.pandas_dtype(str(archive[key + '_dtype']))
+                data[name] = dtype.construct_array_type()(archive[key], archive[key + '_mask'])
+            elif kind == 'string':
+                # Code -1 (missing) picks the trailing None
+                values = np.append(archive[key + '_values'].astype(object), None)
+                dtype = str(archive[key + '_dtype'])
+                data[name] = pd.array(values[archive[key]], dtype=dtype)
+            else:
+                data[name] = archive[key]
+        if '__range__' in archive:
+            index = pd.RangeIndex(*archive['__range__'].tolist())
+        else:
+            index = archive['__index__']
+    return pd.DataFrame(data, index=index, columns=columns)
@@ -0,0 +1,168 @@
+"""Loading and cleaning of the U.S. Census data set."""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+CENSUS_CSV = 'Database_Ncis_and_Census_data/US_Census_Data.csv'
+
+STATES = ['alabama', 'alaska', 'arizona', 'arkansas', 'california',
+          'colorado', 'connecticut', 'delaware', 'florida', 'georgia',
+          'hawaii', 'idaho', 'illinois', 'indiana', 'iowa', 'kansas',
+          'kentucky', 'louisiana', 'maine', 'maryland', 'massachusetts',
+          'michigan', 'minnesota', 'mississippi', 'missouri', 'montana', 'nebraska',
+          'nevada', 'new hampshire', 'new jersey', 'new mexico', 'new york',
+          'north carolina', 'north dakota', 'ohio', 'oklahoma', 'oregon', 'pennsylvania',
+          'rhode island', 'south carolina', 'south dakota', 'tennessee', 'texas', 'utah',
+          'vermont', 'virginia', 'washington', 'west virginia', 'wisconsin', 'wyoming']
+
+# Unit codes returned by parse_census_values
+UNIT_COUNT = 0
+UNIT_PERCENT = 1
+UNIT_CURRENCY = 2
+UNITS = ('count', 'percent', 'currency')
+
+# Value flags listed at the bottom of the census csv
+CENSUS_MARKERS = {
+    '-': 'Either no or too few sample observations were available',
+    'D': 'Suppressed to avoid disclosure of confidential information',
+    'F': 'Fewer than 25 firms',
+    'FN': 'Footnote on this item in place of data',
+    'NA': 'Not available',
+    'S': 'Suppressed; does not meet publication standards',
+    'X': 'Not applicable',
+    'Z': 'Value greater than zero but less than half unit of measure shown',
+}
+
+CensusValues = namedtuple('CensusValues', ['values', 'units', 'markers'])
+
+
+def parse_census_values(block):
+    """Parse a block of raw census strings in one vectorized pass.
+
+    ``block`` is any slice of the census frame holding state values (facts as
+    rows, states as columns). Thousands separators, ``%`` and ``$`` are
+    stripped from every cell at once and the result is returned as a
+    ``CensusValues`` tuple of three frames shaped like ``block``:
+
+    - ``values``: float64 numbers, NaN where a cell is empty or non-numeric
+    - ``units``: int8 unit code per cell (``UNIT_COUNT``, ``UNIT_PERCENT``
+      or ``UNIT_CURRENCY``)
+    - ``markers``: the stripped text of non-numeric cells such as "Z", "D"
+      or "FN" (see ``CENSUS_MARKERS``), ``<NA>`` everywhere else
+    """
+    text = pd.Series(block.to_numpy(dtype=object).ravel(), dtype='string').str.strip()
+    numbers = pd.to_numeric(text.str.replace(r'[,%$]', '', regex=True), errors='coerce')
+
+    units = np.full(len(text), UNIT_COUNT, dtype=np.int8)
+    units[text.str.contains('%', regex=False).fillna(False).to_numpy(dtype=bool)] = UNIT_PERCENT
+    units[text.str.contains('$', regex=False).fillna(False).to_numpy(dtype=bool)] = UNIT_CURRENCY
+
+    markers = text.where(numbers.isna() & text.notna())
+
+    def reshape(values, dtype=None):
+        return pd.DataFrame(np.asarray(values).reshape(block.shape), index=block.index,
+                            columns=block.columns, dtype=dtype)
+
+    return CensusValues(
+        values=reshape(numbers.to_numpy(dtype=np.float64, na_value=np.nan)),
+        units=reshape(units),
+        markers=reshape(markers.to_numpy(dtype=object), dtype='string'),
+    )
+
+
+# Census facts used in the analysis, keyed by their column name in census_clean
+CENSUS_FACTS = {
+    'population_2016': 'Population estimates, July 1, 2016, (V2016)',
+    'population_2010': 'Population estimates base, April 1, 2010, (V2016)',
+    'percent_change_population':
+        'Population, percent change - April 1, 2010 (estimates base) to July 1, 2016, (V2016)',
+    'percent_over_65_2016': 'Persons 65 years and over, percent, July 1, 2016, (V2016)',
+    'percent_over_65_2010': 'Persons 65 years and over, percent, April 1, 2010',
+    'hs_diploma_percentage': 'High school graduate or higher, percent of persons age 25 years+, 2011-2015',
+    'bachelors_degree_percentage': "Bachelor's degree or higher, percent of persons age 25 years+, 2011-2015",
+    'uninsured_percentage': 'Persons without health insurance, under age 65 years, percent',
+    'total_employment_percentage':
+        'In civilian labor force, total, percent of population age 16 years+, 2011-2015',
+    'female_employment_percentage':
+        'In civilian labor force, female, percent of population age 16 years+, 2011-2015',
+    'median_income': 'Median household income (in 2015 dollars), 2011-2015',
+    'income_per_capita': 'Per capita income in past 12 months (in 2015 dollars), 2011-2015',
+    'poverty_percentage': 'Persons in poverty, percent',
+    'number_of_employers': 'Total employer establishments, 2015',
+    'population_density': 'Population per square mile, 2010',
+    'land_area': 'Land area in square miles, 2010',
+}
+
+
+def normalize_fact(fact):
+    """Collapse whitespace and case so Fact labels compare reliably."""
+    return ' '.join(str(fact).split()).lower()
+
+
+def facts_by_state(values):
+    """Turn a fact x state frame of values into the cleaned state x fact frame."""
+    census = values.T
+    census.index = census.index.str.lower().rename('state')
+    return census.reset_index().sort_values('state', ignore_index=True)
+
+
+class FactCatalog:
+    """Look up census facts by a stable key instead of by row position.
+
+    The catalog hashes the normalized ``Fact`` text of ``df_census`` once, so
+    every lookup is a dict access. ``facts`` maps keys to Fact labels and
+    defaults to :data:`CENSUS_FACTS`; pass a larger mapping to make more
+    facts available without touching the rest of the cleaning.
+    """
+
+    def __init__(self, df_census, facts=None):
+        self.df_census = df_census
+        self.facts = CENSUS_FACTS if facts is None else facts
+        fact_column = 'Fact' if 'Fact' in df_census.columns else 'fact'
+        self._rows = {}
+        for label, fact in df_census[fact_column].dropna().items():
+            # Keep the first occurrence, matching drop_duplicates
+            self._rows.setdefault(normalize_fact(fact), label)
+        self._state_columns = [column for column in df_census.columns
+                               if column.lower() not in ('fact', 'fact note')]
+
+    def row(self, key):
+        """Return the ``df_census`` index label of the fact stored under ``key``."""
+        try:
+            return self._rows[normalize_fact(self.facts[key])]
+        except KeyError:
+            raise KeyError('census fact {!r} is not in the catalog or the data'.format(key)) from None
+
+    def fact_values(self, keys=None):
+        """Return the parsed values of ``keys`` (default: every fact) as a fact x state frame.
+
+        Only the requested rows are parsed. Percent facts that some states
+        report as fractions (a cell without a ``%`` sign in a row of
+        percentages) are scaled to percentages.
+        """
+        keys = list(self.facts) if keys is None else list(keys)
+        raw = self.df_census.loc[[self.row(key) for key in keys], self._state_columns]
+        parsed = parse_census_values(raw)
+
+        percent_rows = (parsed.units == UNIT_PERCENT).any(axis=1).to_numpy()[:, None]
+        fractions = percent_rows & (parsed.units == UNIT_COUNT) & parsed.values.notna()
+        values = parsed.values.mask(fractions, parsed.values * 100)
+        values.index = keys
+        return values
+
+    def select(self, keys=None):
+        """Return a cleaned state x fact frame for ``keys`` (default: every fact)."""
+        return facts_by_state(self.fact_values(keys))
+
+
+# Census population columns and the year each one describes
+POPULATION_FACTS = {2010: 'population_2010', 2016: 'population_2016'}
+
+
+def population_table(census_clean):
+    """Return census populations as a state x year frame."""
+    population = census_clean.set_index('state')[list(POPULATION_FACTS.values())]
+    population.columns = pd.Index(list(POPULATION_FACTS), name='year')
+    return population
@@ -0,0 +1,217 @@
+"""Command-line entry point for running pipeline stages outside of Jupyter.
+
+Each subcommand runs one stage of the analysis and whatever it depends on,
+reusing cached stage outputs (see ``gun_checks.pipeline``):
+
+- ``ingest``: clean the NICS and census csv files
+- ``aggregate``: monthly / annual checks per state, checks per capita for
+  every year and annual checks per count column and gun type share
+- ``correlate``: census features vs. gun checks (optionally with bootstrap
+  intervals and permutation p-values)
+- ``detect``: state-months whose checks spike away from their recent
+  history (rolling median / MAD z-scores)
+- ``windows``: rolling and expanding sums, means, year-over-year ratios
+  and maxima of count columns per state and month
+- ``report``: render the figures and build the HTML report
+
+``--trace`` appends a per-stage record of wall time, CPU time (own and
+worker processes') and rows in / out to a JSON Lines file (see
+``gun_checks.trace``), and ``--summary`` prints the slowest stages of the
+run. ``--trace-memory`` adds each stage's peak memory, at the cost of
+slowing allocation-heavy stages down.
+
+The data and analysis paths only import pandas and NumPy. matplotlib and
+seaborn are imported (inside the render workers) only by ``report``, and
+IPython is never imported.
+"""
+
+import argparse
+import os
+
+import pandas as pd
+
+from gun_checks.anomaly import DEFAULT_THRESHOLD, DEFAULT_WINDOW, anomalies, release_alerts
+from gun_checks.breakdown import breakdown, type_shares
+from gun_checks.census import CENSUS_CSV
+from gun_checks.nics import NICS_CSV
+from gun_checks.pipeline import PIPELINE_CACHE_DIR, analysis_pipeline
+from gun_checks.sql import SQL_ENGINES
+from gun_checks.trace import Tracer, row_count
+from gun_checks.windows import DEFAULT_SPECS, cube_window_stats, parse_spec
+
+FORMATS = ('csv', 'parquet', 'json')
+
+
+def write_table(frame, out_dir, name, fmt):
+    """Write ``frame`` (index included as columns) to ``out_dir/name.fmt``."""
+    frame = frame.reset_index() if frame.index.name or frame.index.nlevels > 1 else frame
+    frame = frame.set_axis([str(column) for column in frame.columns], axis=1)
+    path = os.path.join(out_dir, '{}.{}'.format(name, fmt))
+    if fmt == 'csv':
+        frame.to_csv(path, index=False)
+    elif fmt == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        # to_json cannot encode Periods; write them as in the csv ('1998-11')
+        periods = [column for column in frame.columns if isinstance(frame[column].dtype, pd.PeriodDtype)]
+        frame = frame.astype({column: str for column in periods})
+        frame.to_json(path, orient='records', date_format='iso')
+    return path
+
+
+def ingest(pipeline, args):
+    return {
+        'nics_clean': pipeline.run('nics_clean'),
+        'census_clean': pipeline.run('census_clean'),
+    }
+
+
+def aggregate(pipeline, args):
+    monthly_cube = pipeline.run('monthly_cube')
+    yearly_cube = pipeline.run('yearly_cube')
+    if args.store:
+        with pipeline.tracer.stage('store', [monthly_cube]) as record:
+            monthly_cube.save_store(args.store)
+            record['rows_out'] = row_count(monthly_cube)
+    with pipeline.tracer.stage('breakdown', [yearly_cube]) as record:
+        checks_by_column = breakdown(yearly_cube, by=('state', 'year'))
+        record['rows_out'] = row_count(checks_by_column)
+    with pipeline.tracer.stage('type_shares', [checks_by_column]) as record:
+        shares = type_shares(checks_by_column)
+        record['rows_out'] = row_count(shares)
+    return {
+        'monthly_checks': monthly_cube.frame('totals'),
+        'annual_checks': yearly_cube.frame('totals'),
+        'per_capita': pipeline.run('per_capita'),
+        'annual_checks_by_column': checks_by_column,
+        'annual_type_shares': shares,
+    }
+
+
+def correlate(pipeline, args):
+    try:
+        pipeline.run('nics_demographics')
+    except ValueError as error:
+        # --years asked for years without NICS data
+        raise SystemExit('error: {}'.format(error))
+    if args.significance:
+        return {'significance': pipeline.run('significance')}
+    return {'correlations': pipeline.run('correlations')}
+
+
+def detect(pipeline, args):
+    monthly_cube = pipeline.run('monthly_cube')
+    with pipeline.tracer.stage('anomalies', [monthly_cube], latest=args.latest) as record:
+        if args.latest:
+            found = release_alerts(monthly_cube, list(monthly_cube.periods[-args.latest:]), args.column,
+                                   args.window, args.threshold)
+        else:
+            found = anomalies(monthly_cube, args.column, args.window, args.threshold)
+        record['rows_out'] = row_count(found)
+    return {'anomalies': found}
+
+
+def windows(pipeline, args):
+    monthly_cube = pipeline.run('monthly_cube')
+    with pipeline.tracer.stage('window_stats', [monthly_cube], specs=len(args.specs)) as record:
+        stats = cube_window_stats(monthly_cube, args.columns, args.specs)
+        record['rows_out'] = row_count(stats)
+    return {'window_stats': stats.rename_axis(['state', 'month']).reset_index()}
+
+
+def report(pipeline, args):
+    """Render the figures and build the HTML report; imports plotting lazily."""
+    from gun_checks.figures import notebook_figures
+    from gun_checks.render import render_figures
+    from gun_checks.report import build_report, notebook_sections
+
+    nics_clean = pipeline.run('nics_clean')
+    census_clean = pipeline.run('census_clean')
+    nics_demographics = pipeline.run('nics_demographics')
+    significance = pipeline.run('significance')
+    with pipeline.tracer.stage('figures', [nics_clean, census_clean, nics_demographics]) as record:
+        specs = notebook_figures(nics_clean, census_clean, nics_demographics)
+        figure_paths, rendered = render_figures(specs, out_dir=os.path.join(args.out_dir, 'figures'),
+                                                processes=args.processes)
+        record.update(rows_out=len(figure_paths), rendered=len(rendered))
+    with pipeline.tracer.stage('report') as record:
+        sections = notebook_sections(nics_clean, census_clean, nics_demographics, significance, figure_paths)
+        path, rendered = build_report(sections, out_path=os.path.join(args.out_dir, 'report.html'))
+        record.update(rows_out=len(sections), rendered=len(rendered))
+    print(path)
+    return {}
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--nics-csv', default=NICS_CSV, help='path to gun_data.csv')
+    common.add_argument('--census-csv', default=CENSUS_CSV, help='path to US_Census_Data.csv')
+    common.add_argument('--cache-dir', default=PIPELINE_CACHE_DIR, help='pipeline stage cache directory')
+    common.add_argument('--out-dir', default='output', help='directory for the output files')
+    common.add_argument('--format', choices=FORMATS, default='csv', help='output table format')
+    common.add_argument('--backend', choices=('pandas',) + SQL_ENGINES, default='pandas',
+                        help='engine that aggregates the NICS counts (duckdb must be installed)')
+    common.add_argument('--trace', metavar='PATH', help='append per-stage timings to this JSON Lines file')
+    common.add_argument('--summary', action='store_true', help='print the slowest stages of this run')
+    common.add_argument('--trace-memory', action='store_true',
+                        help='also record peak memory per stage with tracemalloc (slows stages down)')
+    parser = argparse.ArgumentParser(
+        prog='python -m gun_checks',
+        description='Run one stage of the NICS / census analysis and the stages it depends on.',
+    )
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subcommands.add_parser('ingest', parents=[common], help='clean the NICS and census data')
+    ingest_parser.set_defaults(func=ingest)
+    aggregate_parser = subcommands.add_parser(
+        'aggregate', parents=[common], help='checks per state by month and year, and per capita for every year')
+    aggregate_parser.add_argument('--store', metavar='DIR',
+                                  help='also write the monthly cube as a memory-mapped store')
+    aggregate_parser.set_defaults(func=aggregate)
+    correlate_parser = subcommands.add_parser('correlate', parents=[common],
+                                              help='correlate census features with gun checks')
+    correlate_parser.add_argument('--significance', action='store_true',
+                                  help='add bootstrap confidence intervals and permutation p-values')
+    correlate_parser.add_argument('--resamples', type=int, default=10_000)
+    correlate_parser.add_argument('--years', type=int, nargs='+', default=[2010, 2016],
+                                  help='years to merge with the census data')
+    correlate_parser.set_defaults(func=correlate)
+    detect_parser = subcommands.add_parser('detect', parents=[common],
+                                           help='flag state-months with anomalous numbers of checks')
+    detect_parser.add_argument('--column', default='totals', help='count column to scan')
+    detect_parser.add_argument('--window', type=int, default=DEFAULT_WINDOW, help='months of history per score')
+    detect_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                               help='flag months whose robust z-score exceeds this')
+    detect_parser.add_argument('--latest', type=int, metavar='N',
+                               help='only score the newest N months (e.g. a new release)')
+    detect_parser.set_defaults(func=detect)
+    windows_parser = subcommands.add_parser('windows', parents=[common],
+                                            help='rolling and expanding window statistics per state and month')
+    windows_parser.add_argument('--columns', nargs='+', default=['totals', 'handgun', 'long_gun'],
+                                help='count columns to summarize')
+    windows_parser.add_argument('--specs', nargs='+', type=parse_spec, default=list(DEFAULT_SPECS),
+                                help='window specs such as sum:3, mean:12, ratio:12 or max (expanding)')
+    windows_parser.set_defaults(func=windows)
+    report_parser = subcommands.add_parser('report', parents=[common],
+                                           help='render the figures and build the HTML report')
+    report_parser.add_argument('--processes', type=int, default=None, help='figure rendering processes')
+    report_parser.add_argument('--resamples', type=int, default=10_000)
+    report_parser.set_defaults(func=report)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    tracer = Tracer(args.trace, memory=args.trace_memory)
+    # The report's figures and tables compare 2010 and 2016, so only correlate takes --years
+    pipeline = analysis_pipeline(args.nics_csv, args.census_csv, years=getattr(args, 'years', (2010, 2016)),
+                                 resamples=getattr(args, 'resamples', 10_000), cache_dir=args.cache_dir,
+                                 tracer=tracer, backend=args.backend)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name, frame in args.func(pipeline, args).items():
+        with tracer.stage('write_' + name, [frame]) as record:
+            path = write_table(frame, args.out_dir, name, args.format)
+            record['rows_out'] = row_count(frame)
+        print(path)
+    if args.summary:
+        print(tracer.summary())
@@ -0,0 +1,88 @@
+"""Pearson correlations of every census feature against every gun check column.
+
+The notebook computes one ``Series.corr`` per feature and year. Here all
+features and all ``gun_checks_<year>`` / ``gun_checks_per_capita_<year>``
+columns are correlated at once with a handful of matrix products.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+TARGET_PATTERN = re.compile(r'^gun_checks(?P<per_capita>_per_capita)?_(?P<year>\d{4})$')
+
+
+def pearson_matrix(x, y):
+    """Return pairwise-complete Pearson r and pair counts between columns.
+
+    ``x`` has shape ``(..., n, f)`` and ``y`` ``(..., n, t)``; any leading
+    dimensions are treated as a batch. NaNs are skipped pair by pair, as in
+    ``DataFrame.corr``. Returns ``(r, n)`` with shape ``(..., f, t)``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Centering does not change r but keeps the sums below well conditioned
+    x = x - np.nanmean(x, axis=-2, keepdims=True)
+    y = y - np.nanmean(y, axis=-2, keepdims=True)
+
+    x_valid = ~np.isnan(x)
+    y_valid = ~np.isnan(y)
+    x = np.where(x_valid, x, 0.0)
+    y = np.where(y_valid, y, 0.0)
+    x_valid = x_valid.astype(np.float64)
+    y_valid = y_valid.astype(np.float64)
+
+    def cross(a, b):
+        return np.swapaxes(a, -1, -2) @ b
+
+    n = cross(x_valid, y_valid)
+    sum_x = cross(x, y_valid)
+    sum_y = cross(x_valid, y)
+    covariance = n * cross(x, y) - sum_x * sum_y
+    variance_x = n * cross(x * x, y_valid) - sum_x ** 2
+    variance_y = n * cross(x_valid, y * y) - sum_y ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = covariance / np.sqrt(variance_x * variance_y)
+    r[n < 2] = np.nan
+    return np.clip(r, -1.0, 1.0), n.astype(np.int64)
+
+
+def target_columns(frame):
+    """Return the gun check columns of ``frame`` with their measure and year."""
+    targets = []
+    for column in frame.columns:
+        match = TARGET_PATTERN.match(str(column))
+        if match:
+            measure = 'per_capita' if match.group('per_capita') else 'checks'
+            targets.append((column, measure, int(match.group('year'))))
+    return targets
+
+
+def correlation_table(nics_demographics, features=None):
+    """Correlate every census feature with every gun check column.
+
+    ``features`` defaults to every numeric column that is not a gun check
+    column. Returns a tidy frame with one row per (feature, target) and
+    columns ``feature``, ``target``, ``measure`` (``checks`` or
+    ``per_capita``), ``year``, ``r`` and ``n`` (number of states used).
+    """
+    targets = target_columns(nics_demographics)
+    target_names = [name for name, _, _ in targets]
+    if features is None:
+        numeric = nics_demographics.select_dtypes('number').columns
+        features = [column for column in numeric if column not in target_names]
+
+    r, n = pearson_matrix(nics_demographics[features].to_numpy(dtype=np.float64),
+                          nics_demographics[target_names].to_numpy(dtype=np.float64))
+
+    measures = [measure for _, measure, _ in targets]
+    years = [year for _, _, year in targets]
+    return pd.DataFrame({
+        'feature': np.repeat(features, len(targets)),
+        'target': np.tile(target_names, len(features)),
+        'measure': np.tile(measures, len(features)),
+        'year': np.tile(years, len(features)),
+        'r': r.ravel(),
+        'n': n.ravel(),
+    })
@@ -0,0 +1,232 @@
+"""Dense state x period x column aggregate of the NICS counts.
+
+Grouping ``nics_clean`` again for every year, state or time window repeats
+a scan over all rows. ``AggregateCube`` sums the count columns once into a
+NumPy array with label indexes on each axis; afterwards a per-year or
+per-window total is an array slice plus a sum over the remaining axes.
+
+A cube can also be kept on disk as a store: the array as a ``.npy`` file
+opened with ``mmap_mode='r'`` plus a small JSON file of axis labels. Opening
+a store reads only the labels, whatever the size of the array, any number
+of processes can open the same store and share its pages through the OS
+page cache, and slices read only the pages they touch.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from gun_checks.schema import COUNT_COLUMNS
+
+
+STORE_VALUES = 'values.npy'
+STORE_LABELS = 'labels.json'
+
+
+def _axis_slice(positions):
+    """Return ``positions`` as a slice if they are consecutive, else unchanged."""
+    positions = np.asarray(positions)
+    if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+        return slice(int(positions[0]), int(positions[0]) + len(positions))
+    return positions
+
+
+def _plain_index(uniques, name):
+    """Turn factorize uniques into a plain (non-categorical) named index."""
+    if isinstance(uniques.dtype, pd.CategoricalDtype):
+        uniques = uniques.astype(uniques.dtype.categories.dtype)
+    return pd.Index(uniques, name=name)
+
+
+class AggregateCube:
+    """Summed NICS counts indexed by state, period and count column.
+
+    ``values`` has shape ``(len(states), len(periods), len(columns))``.
+    Periods are sorted, so any time window is a contiguous slice of the
+    second axis.
+    """
+
+    def __init__(self, values, states, periods, columns):
+        self.values = values
+        self.states = pd.Index(states, name='state')
+        self.periods = pd.Index(periods)
+        self.columns = pd.Index(columns)
+
+    @property
+    def period_name(self):
+        return self.periods.name
+
+    @classmethod
+    def from_frame(cls, nics, period='month', columns=None):
+        """Build a cube from a cleaned NICS frame in one pass per column.
+
+        ``period`` names the time column to use as the second axis (``month``
+        or ``year``). ``columns`` defaults to every count column present.
+        Missing counts are treated as zero, as ``groupby().sum()`` does.
+        """
+        if columns is None:
+            columns = [column for column in COUNT_COLUMNS if column in nics.columns]
+        state_codes, states = pd.factorize(nics['state'], sort=True)
+        period_codes, periods = pd.factorize(nics[period], sort=True)
+        states = _plain_index(states, 'state')
+        periods = _plain_index(periods, period)
+
+        shape = (len(states), len(periods))
+        flat = state_codes * shape[1] + period_codes
+        integer = all(pd.api.types.is_integer_dtype(nics[column]) for column in columns)
+        values = np.empty(shape + (len(columns),), dtype=np.int64 if integer else np.float64)
+        for i, column in enumerate(columns):
+            weights = nics[column].to_numpy(dtype=np.float64, na_value=0)
+            sums = np.bincount(flat, weights=weights, minlength=shape[0] * shape[1])
+            values[:, :, i] = sums.reshape(shape)
+        return cls(values, states, periods, columns)
+
+    def to_years(self):
+        """Collapse a monthly cube into a cube with one integer year per period."""
+        years = np.asarray(self.periods.year)
+        starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+        values = np.add.reduceat(self.values, starts, axis=1) if len(starts) else self.values
+        return AggregateCube(values, self.states, pd.Index(years[starts], name='year'), self.columns)
+
+    def window(self, start=None, end=None):
+        """Return a cube viewing the periods between ``start`` and ``end`` inclusive.
+
+        The periods are sorted, so the bounds are found by binary search and
+        the result shares memory with this cube.
+        """
+        first = 0 if start is None else self.periods.searchsorted(start, side='left')
+        last = len(self.periods) if end is None else self.periods.searchsorted(end, side='right')
+        return AggregateCube(self.values[:, first:last], self.states, self.periods[first:last], self.columns)
+
+    @staticmethod
+    def _positions(index, labels):
+        positions = index.get_indexer_for(labels)
+        if (positions < 0).any():
+            raise KeyError('{!r} not in the cube'.format([label for label, position in zip(labels, positions)
+                                                          if position < 0]))
+        return _axis_slice(positions)
+
+    def select(self, states=None, columns=None):
+        """Return a cube restricted to the ``states`` and ``columns`` labels.
+
+        Labels that are consecutive on their axis (a single state or column,
+        or a run of them in order) are selected with a slice, so the result
+        is a view; any other selection is a copy.
+        """
+        state_positions = slice(None) if states is None else self._positions(self.states, states)
+        column_positions = slice(None) if columns is None else self._positions(self.columns, columns)
+        values = self.values[state_positions]
+        values = values[:, :, column_positions]
+        return AggregateCube(values, self.states[state_positions], self.periods, self.columns[column_positions])
+
+    def column(self, column='totals'):
+        """Return the state x period array of one count column (a view)."""
+        return self.values[:, :, self.columns.get_loc(column)]
+
+    def totals(self, column='totals', by=None):
+        """Sum ``column`` over the cube.
+
+        ``by=None`` returns a single number, ``by='state'`` a Series per
+        state and ``by=<period name>`` a Series per period.
+        """
+        values = self.column(column)
+        if by is None:
+            return values.sum()
+        if by == 'state':
+            return pd.Series(values.sum(axis=1), index=self.states, name=column)
+        if by == self.period_name:
+            return pd.Series(values.sum(axis=0), index=self.periods, name=column)
+        raise ValueError('by must be None, "state" or {!r}'.format(self.period_name))
+
+    def save(self, path):
+        """Write the cube to ``path`` as an uncompressed ``.npz`` archive."""
+        arrays = {
+            'values': self.values,
+            'states': np.asarray(self.states, dtype=str),
+            'columns': np.asarray(self.columns, dtype=str),
+            'period_name': np.array(self.period_name),
+        }
+        if isinstance(self.periods, pd.PeriodIndex):
+            arrays['periods'] = self.periods.asi8
+            arrays['period_dtype'] = np.array(str(self.periods.dtype))
+        else:
+            arrays['periods'] = self.periods.to_numpy()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a cube written by :meth:`save`."""
+        with np.load(path) as archive:
+            name = str(archive['period_name'])
+            if 'period_dtype' in archive:
+                dtype = pd.api.types.pandas_dtype(str(archive['period_dtype']))
+                periods = pd.PeriodIndex(pd.arrays.PeriodArray(archive['periods'], dtype=dtype), name=name)
+            else:
+                periods = pd.Index(archive['periods'], name=name)
+            return cls(archive['values'], archive['states'].astype(object), periods,
+                       archive['columns'].astype(object))
+
+    def _labels(self):
+        labels = {
+            'shape': list(self.values.shape),
+            'dtype': self.values.dtype.str,
+            'states': [str(state) for state in self.states],
+            'columns': [str(column) for column in self.columns],
+            'period_name': self.period_name,
+        }
+        if isinstance(self.periods, pd.PeriodIndex):
+            labels['periods'] = self.periods.asi8.tolist()
+            labels['period_dtype'] = str(self.periods.dtype)
+        else:
+            labels['periods'] = self.periods.tolist()
+        return labels
+
+    def save_store(self, directory):
+        """Write the cube to ``directory`` as a store for :meth:`open_store`.
+
+        The array is written in C order (state, period, column), so one
+        state, or one state and time window, is a contiguous run of the file.
+        """
+        os.makedirs(directory, exist_ok=True)
+        values_path = os.path.join(directory, STORE_VALUES)
+        labels_path = os.path.join(directory, STORE_LABELS)
+        tmp_values = values_path + '.tmp'
+        stored = np.lib.format.open_memmap(tmp_values, mode='w+', dtype=self.values.dtype,
+                                           shape=self.values.shape)
+        stored[...] = self.values
+        stored.flush()
+        del stored
+        with open(labels_path + '.tmp', 'w') as f:
+            json.dump(self._labels(), f)
+        os.replace(tmp_values, values_path)
+        os.replace(labels_path + '.tmp', labels_path)
+
+    @classmethod
+    def open_store(cls, directory):
+        """Open a store written by :meth:`save_store` without reading the array.
+
+        ``values`` is a read-only ``np.memmap``; slicing it (``window``,
+        ``select``, ``column``) maps pages in on demand rather than copying.
+        """
+        with open(os.path.join(directory, STORE_LABELS)) as f:
+            labels = json.load(f)
+        values = np.load(os.path.join(directory, STORE_VALUES), mmap_mode='r')
+        if list(values.shape) != labels['shape'] or values.dtype.str != labels['dtype']:
+            raise ValueError('{} changed while it was being opened; open it again'.format(directory))
+        name = labels['period_name']
+        if 'period_dtype' in labels:
+            dtype = pd.api.types.pandas_dtype(labels['period_dtype'])
+            periods = pd.PeriodIndex(pd.arrays.PeriodArray(np.asarray(labels['periods'], dtype=np.int64),
+                                                           dtype=dtype), name=name)
+        else:
+            periods = pd.Index(labels['periods'], name=name)
+        return cls(values, labels['states'], periods, labels['columns'])
+
+    def frame(self, column='totals'):
+        """Return ``column`` as a state x period DataFrame."""
+        return pd.DataFrame(self.column(column), index=self.states, columns=self.periods)
@@ -0,0 +1,26 @@
+"""Merging yearly NICS totals with the census data."""
+
+from gun_checks.population import population_panel
+
+
+def merge_demographics(yearly_cube, census_clean, years=(2010, 2016)):
+    """Return the notebook's ``nics_demographics`` frame.
+
+    One ``gun_checks_<year>`` column per year in ``years`` (state totals from
+    ``yearly_cube``) is merged with ``census_clean`` on ``state``, followed by
+    one ``gun_checks_per_capita_<year>`` column per year that divides by the
+    census population interpolated to that year (see
+    ``gun_checks.population``). Raises ``ValueError`` for years without
+    NICS data.
+    """
+    years = list(years)
+    missing = [year for year in years if year not in yearly_cube.periods]
+    if missing:
+        raise ValueError('no NICS checks for {}; the data covers {} to {}'.format(
+            ', '.join(str(year) for year in missing), yearly_cube.periods.min(), yearly_cube.periods.max()))
+    checks = yearly_cube.frame('totals')[years]
+    per_capita = checks / population_panel(census_clean, years).reindex(checks.index)
+    checks.columns = ['gun_checks_{}'.format(year) for year in years]
+    per_capita.columns = ['gun_checks_per_capita_{}'.format(year) for year in years]
+    nics_demographics = checks.reset_index().merge(census_clean, how='inner', on='state')
+    return nics_demographics.merge(per_capita.reset_index(), how='left', on='state')
@@ -0,0 +1,99 @@
+"""The notebook's figures expressed as ``FigureSpec`` objects for ``render``."""
+
+from gun_checks.cube import AggregateCube
+from gun_checks.render import FigureSpec
+
+TREND_YLABEL = 'Background Checks (Millions)'
+
+# (name, feature column(s) for 2010 and 2016, x label, title, colors for 2010 and 2016)
+REGPLOTS = [
+    ('female_employment_regplot', 'female_employment_percentage', 'Female Employment Percentage',
+     'Female Employment vs. Guns per Capita', ('#dda0dd', '#8b668b')),
+    ('median_income_regplot', 'median_income', 'Median Income (Dollars)',
+     'Median Income vs. Guns per Capita', ('#7a378b', '#ba55d3')),
+    ('income_per_capita_regplot', 'income_per_capita', 'Income per Capita (Dollars)',
+     'Income per Capita vs. Guns per Capita', ('#8470ff', '#483d8b')),
+    ('senior_population_regplot', ('percent_over_65_2010', 'percent_over_65_2016'), 'Population over 65 (%)',
+     'Senior Population vs. Guns per Capita', ('#6959cd', '#cd96cd')),
+    ('hs_diploma_regplot', 'hs_diploma_percentage', 'Percentage High School Diplomas(%)',
+     'Rate of High School Diplomas vs. Guns per Capita', ('#6959cd', '#cd96cd')),
+    ('bachelors_degree_regplot', 'bachelors_degree_percentage', 'Percentage Bachelors Degrees (%)',
+     'Rate of Bachelors Degree vs. Guns per Capita', ('#6959cd', '#cd96cd')),
+    ('uninsured_regplot', 'uninsured_percentage', 'Percent Uninsured(%)',
+     'Level of Uninsured vs. Guns per Capita', ('#6959cd', '#cd96cd')),
+]
+
+# (name, bar layers, title, y label)
+BARPLOTS = [
+    ('female_employment_bar', [{'y': 'female_employment_percentage', 'color': 'pink'}],
+     'Female Employment', 'Female Employment (%)'),
+    ('income_per_capita_bar', [{'y': 'income_per_capita', 'color': '#ba55d3'}],
+     'Income per Capita Across United States', 'Income per Capita (Dollars)'),
+    ('senior_population_bar',
+     [{'y': 'percent_over_65_2010', 'label': '2010', 'color': 'purple'},
+      {'y': 'percent_over_65_2016', 'label': '2016', 'color': 'blue', 'alpha': .5}],
+     'Population over 65', 'Percent Population over 65 (%)'),
+    ('education_bar',
+     [{'y': 'hs_diploma_percentage', 'label': 'high school diploma', 'color': '#ffb6c1'},
+      {'y': 'bachelors_degree_percentage', 'label': 'bachelors degree', 'color': '#5d478b', 'alpha': .7}],
+     'Prevalence of High School and Bachelors Degrees in US', 'Percent of Population (%)'),
+    ('uninsured_bar', [{'y': 'uninsured_percentage', 'color': '#ba55d3'}],
+     'Level of Unisured Americans', 'Percent Unisured (%)'),
+]
+
+
+def trend_figures(nics_clean):
+    """Return the monthly and annual background check trend figures."""
+    monthly_cube = AggregateCube.from_frame(nics_clean, period='month', columns=['totals'])
+    yearly_cube = monthly_cube.to_years()
+
+    def monthly(name, start, end, title, grid=True):
+        data = monthly_cube.window(start, end).totals(by='month')
+        return FigureSpec(name, 'line', data, {'title': title, 'xlabel': 'Month',
+                                               'ylabel': TREND_YLABEL, 'grid': grid})
+
+    def annual(name, start, end, title):
+        data = yearly_cube.window(start, end).totals(by='year')
+        return FigureSpec(name, 'line', data, {'title': title, 'xlabel': 'Year',
+                                               'ylabel': TREND_YLABEL, 'grid': True})
+
+    return [
+        monthly('monthly_trends', None, None, 'Trends in Monthly Background Checks (1998-2017)', grid=False),
+        monthly('monthly_1999_2000', '1999-01', '2000-12', 'Trends in Background Checks (Jan 1999- Dec 2000)'),
+        monthly('monthly_2012', '2012-01', '2012-12', 'Trends in Monthly Background Checks (Jan-Dec 2012)'),
+        monthly('monthly_2015_2016', '2015-01', '2016-12', 'Trends in Monthly Background Checks (Jan 2015 - Dec 2016)'),
+        annual('annual_trends', None, None, 'Trends in Annual Background Checks (1998-2017)'),
+        annual('annual_1999_2016', 1999, 2016, 'Trends in Annual Background Checks (1999-2016)'),
+    ]
+
+
+def demographic_figures(nics_demographics):
+    """Return the census bar plots and the feature vs. checks per capita regression plots."""
+    specs = []
+    for name, layers, title, ylabel in BARPLOTS:
+        columns = ['state'] + [layer['y'] for layer in layers]
+        specs.append(FigureSpec(name, 'bar', nics_demographics[columns],
+                                {'layers': layers, 'title': title, 'xlabel': 'State', 'ylabel': ylabel}))
+
+    for name, features, xlabel, title, colors in REGPLOTS:
+        if isinstance(features, str):
+            features = (features, features)
+        layers = [{'x': feature, 'y': 'gun_checks_per_capita_{}'.format(year), 'label': str(year), 'color': color}
+                  for feature, year, color in zip(features, (2010, 2016), colors)]
+        columns = list(dict.fromkeys([layer['x'] for layer in layers] + [layer['y'] for layer in layers]))
+        specs.append(FigureSpec(name, 'regplot', nics_demographics[columns],
+                                {'layers': layers, 'title': title, 'xlabel': xlabel,
+                                 'ylabel': 'Gun Checks per Capita'}))
+    return specs
+
+
+def notebook_figures(nics_clean, census_clean, nics_demographics):
+    """Return specs for every figure drawn in Investigate_a_Dataset.py."""
+    counts = nics_clean.select_dtypes('number')
+    return (
+        [FigureSpec('nics_histograms', 'hist', counts, {'figsize': (16, 16), 'layout': (6, 6)})]
+        + trend_figures(nics_clean)
+        + [FigureSpec('census_histograms', 'hist', census_clean.select_dtypes('number'),
+                      {'figsize': (16, 16), 'layout': (6, 4), 'bins': 20})]
+        + demographic_figures(nics_demographics)
+    )
@@ -0,0 +1,142 @@
+"""Watermark-based incremental ingest of newly published NICS months.
+
+The FBI adds each new month to the top of gun_data.csv. ``IncrementalIngest``
+remembers the latest month it has processed (the watermark) together with
+the monthly and yearly aggregate cubes. ``update`` reads the csv from the
+top only until it reaches the watermark, folds the new rows into the cubes
+and refreshes the per-capita checks of the affected years (populations are
+interpolated from the census anchors, see ``gun_checks.population``), so one
+new month costs a few small array operations instead of a full rebuild.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from gun_checks.cube import AggregateCube
+from gun_checks.nics import NICS_CSV, clean_nics, load_nics
+from gun_checks.population import per_capita_table
+from gun_checks.schema import READ_DTYPES
+
+
+def read_new_rows(path=NICS_CSV, watermark=None, chunksize=1_000):
+    """Return the cleaned rows of ``path`` whose month is after ``watermark``.
+
+    The csv is read in chunks from the top and reading stops at the first
+    chunk that reaches the watermark, so only the new months (plus at most
+    one chunk) are parsed.
+    """
+    new_rows = []
+    with pd.read_csv(path, dtype=READ_DTYPES, chunksize=chunksize) as reader:
+        for chunk in reader:
+            if watermark is None:
+                new_rows.append(chunk)
+                continue
+            months = pd.to_datetime(chunk['month'], format='%Y-%m').dt.to_period('M')
+            newer = months > watermark
+            new_rows.append(chunk[newer])
+            if not newer.all():
+                break
+    if not new_rows:
+        raise ValueError('{} contains no rows'.format(path))
+    return clean_nics(pd.concat(new_rows, ignore_index=True))
+
+
+def _align_states(cube, states):
+    """Return ``cube`` with its state axis reindexed to ``states`` (zero filled)."""
+    if cube.states.equals(states):
+        return cube
+    positions = cube.states.get_indexer(states)
+    values = np.zeros((len(states),) + cube.values.shape[1:], dtype=cube.values.dtype)
+    found = positions >= 0
+    values[found] = cube.values[positions[found]]
+    return AggregateCube(values, states, cube.periods, cube.columns)
+
+
+class IncrementalIngest:
+    """Monthly / yearly NICS aggregates that can absorb newly published months.
+
+    State is kept in ``state_dir``: the two cubes, the population table used
+    for per-capita checks and a small json file holding the watermark.
+    """
+
+    def __init__(self, state_dir, monthly, yearly, population=None):
+        self.state_dir = state_dir
+        self.monthly = monthly
+        self.yearly = yearly
+        self.population = population
+        self.per_capita = None if population is None else per_capita_table(yearly, population)
+
+    @property
+    def watermark(self):
+        return self.monthly.periods[-1]
+
+    @classmethod
+    def bootstrap(cls, state_dir, path=NICS_CSV, population=None):
+        """Build the aggregates from the full csv and save them to ``state_dir``."""
+        monthly = AggregateCube.from_frame(load_nics(path, cache_dir=None), period='month')
+        ingest = cls(state_dir, monthly, monthly.to_years(), population)
+        ingest.save()
+        return ingest
+
+    @classmethod
+    def open(cls, state_dir):
+        """Load the aggregates saved by :meth:`save`."""
+        monthly = AggregateCube.load(os.path.join(state_dir, 'monthly.npz'))
+        yearly = AggregateCube.load(os.path.join(state_dir, 'yearly.npz'))
+        population = None
+        population_path = os.path.join(state_dir, 'population.csv')
+        if os.path.exists(population_path):
+            population = pd.read_csv(population_path, index_col='state')
+            population.columns = population.columns.astype(int).rename('year')
+        return cls(state_dir, monthly, yearly, population)
+
+    def save(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.monthly.save(os.path.join(self.state_dir, 'monthly.npz'))
+        self.yearly.save(os.path.join(self.state_dir, 'yearly.npz'))
+        if self.population is not None:
+            self.population.to_csv(os.path.join(self.state_dir, 'population.csv'))
+        with open(os.path.join(self.state_dir, 'watermark.json'), 'w') as f:
+            json.dump({'month': str(self.watermark)}, f)
+
+    def update(self, path=NICS_CSV, save=True):
+        """Fold months newer than the watermark into the aggregates.
+
+        Returns the list of months that were added (empty when the csv has
+        nothing new).
+        """
+        new_rows = read_new_rows(path, self.watermark)
+        if new_rows.empty:
+            return []
+
+        added = AggregateCube.from_frame(new_rows, period='month', columns=list(self.monthly.columns))
+        states = self.monthly.states.union(added.states)
+        monthly = _align_states(self.monthly, states)
+        added = _align_states(added, states)
+        self.monthly = AggregateCube(
+            np.concatenate([monthly.values, added.values.astype(monthly.values.dtype)], axis=1),
+            states, monthly.periods.append(added.periods), monthly.columns,
+        )
+
+        # Add the new months to the years they belong to, appending new years
+        yearly = _align_states(self.yearly, states)
+        new_years = added.to_years()
+        appended = new_years.periods.difference(yearly.periods)
+        if len(appended):
+            zeros = np.zeros((len(states), len(appended), len(yearly.columns)), dtype=yearly.values.dtype)
+            yearly = AggregateCube(np.concatenate([yearly.values, zeros], axis=1), states,
+                                   yearly.periods.append(appended), yearly.columns)
+        positions = yearly.periods.get_indexer(new_years.periods)
+        yearly.values[:, positions] += new_years.values.astype(yearly.values.dtype)
+        self.yearly = yearly
+
+        if self.population is not None:
+            changed = list(new_years.periods)
+            self.per_capita = self.per_capita.reindex(columns=self.per_capita.columns.union(changed))
+            self.per_capita[changed] = per_capita_table(self.yearly, self.population, changed)
+        if save:
+            self.save()
+        return list(added.periods)
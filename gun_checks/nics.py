@@ -0,0 +1,70 @@
+"""Loading and cleaning of the NICS background check data set."""
+
+import os
+
+import pandas as pd
+
+from gun_checks.cache import file_digest, load_frame, save_frame
+from gun_checks.schema import READ_DTYPES, apply_schema
+
+NICS_CSV = 'Database_Ncis_and_Census_data/gun_data.csv'
+CACHE_DIR = '.nics_cache'
+
+# Bump whenever clean_nics changes so stale cache files are not reused
+CACHE_VERSION = 3
+
+# Districts and territories reported by NICS that are not U.S. states
+NON_US_STATES = ['District of Columbia', 'Guam', 'Mariana Islands', 'Puerto Rico', 'Virgin Islands']
+
+
+def read_nics(path=NICS_CSV):
+    """Read the raw NICS csv with the compact schema from ``gun_checks.schema``."""
+    return apply_schema(pd.read_csv(path, dtype=READ_DTYPES))
+
+
+def drop_non_states(df_nics):
+    """Return the rows of ``df_nics`` that are not in :data:`NON_US_STATES`."""
+    return df_nics[~df_nics['state'].isin(NON_US_STATES)]
+
+
+def normalize_nics(df_nics):
+    """Return ``df_nics`` with lower case state names and an ``int16`` ``year`` column."""
+    states = df_nics['state'].cat.remove_unused_categories()
+    return df_nics.assign(state=states.cat.rename_categories(lambda state: state.lower()),
+                          year=df_nics['month'].dt.year.astype('int16'))
+
+
+def clean_nics(df_nics):
+    """Apply the notebook's NICS cleaning steps and return a new frame.
+
+    Non-state areas are removed, an ``int16`` ``year`` column is added and
+    state names are lower cased. Unlike the notebook, missing counts are not
+    mean-filled: they stay ``<NA>`` in the nullable integer columns so sums
+    skip them and the mask records where data was never collected.
+    """
+    return normalize_nics(drop_non_states(apply_schema(df_nics)))
+
+
+def cache_path(path=NICS_CSV, cache_dir=CACHE_DIR):
+    """Return the cache file for the current contents of ``path``."""
+    name = 'nics-v{}-{}.npz'.format(CACHE_VERSION, file_digest(path))
+    return os.path.join(cache_dir, name)
+
+
+def load_nics(path=NICS_CSV, cache_dir=CACHE_DIR):
+    """Return the cleaned NICS frame, reusing the binary cache when possible.
+
+    The cache is keyed on the sha256 of the csv, so editing or replacing the
+    file always triggers a fresh parse. Pass ``cache_dir=None`` to bypass
+    the cache entirely.
+    """
+    if cache_dir is None:
+        return clean_nics(read_nics(path))
+
+    cached = cache_path(path, cache_dir)
+    if os.path.exists(cached):
+        return load_frame(cached)
+
+    nics_clean = clean_nics(read_nics(path))
+    save_frame(nics_clean, cached)
+    return nics_clean
@@ -0,0 +1,228 @@
+"""Memoized dependency graph for the wrangling-to-analysis pipeline.
+
+Each ``Stage`` declares the stages it depends on, its parameters and which
+parameters are input files. A stage's cache key is a digest of its name,
+version, function source, parameters, input file contents and the keys of
+its dependencies, and its output is pickled under that key. Running a stage
+therefore recomputes only what is downstream of a change: editing a census
+fact invalidates ``census_clean`` and everything built on it, while
+``nics_clean`` (and gun_data.csv) is never touched.
+
+The function source covers every package module the function calls into and
+the package modules those import, so editing library code such as
+``gun_checks.demographics`` also invalidates the stages built on it. Methods
+called on a dependency's output (``monthly_cube.to_years()``) are covered
+by the dependency's key, which digests the module that built the output.
+
+Input files are fingerprinted by (size, mtime) first, so an unchanged csv is
+not even re-hashed. Every stage computed or loaded from the cache is
+recorded by the pipeline's ``gun_checks.trace.Tracer``.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+from collections import namedtuple
+
+import pandas as pd
+
+from gun_checks.cache import file_digest
+from gun_checks.census import CENSUS_CSV, CENSUS_FACTS, FactCatalog, population_table
+from gun_checks.correlate import correlation_table
+from gun_checks.cube import AggregateCube
+from gun_checks.demographics import merge_demographics
+from gun_checks.nics import NICS_CSV, load_nics
+from gun_checks.population import per_capita_table
+from gun_checks.significance import significance_table
+from gun_checks.sql import aggregate_sql
+from gun_checks.trace import Tracer, row_count
+
+PIPELINE_CACHE_DIR = '.pipeline_cache'
+
+Stage = namedtuple('Stage', ['name', 'func', 'deps', 'params', 'files', 'version'],
+                   defaults=((), {}, (), 1))
+
+
+PACKAGE = __name__.partition('.')[0]
+
+
+def _package_modules(func):
+    """Return the package modules ``func`` calls into, directly or through their imports."""
+    pending = [inspect.getmodule(func.__globals__.get(name)) for name in func.__code__.co_names]
+    modules = {}
+    while pending:
+        module = pending.pop()
+        if module is None or module.__name__ in modules or not module.__name__.startswith(PACKAGE + '.'):
+            continue
+        modules[module.__name__] = module
+        imported = re.findall(r'^(?:from|import) ({}\.\w+)'.format(PACKAGE), inspect.getsource(module), re.M)
+        pending.extend(sys.modules.get(name) for name in imported)
+    return [modules[name] for name in sorted(modules)]
+
+
+def _code_digest(func):
+    """Digest the source of ``func`` and of every package module it depends on.
+
+    A change anywhere in the library code a stage calls (e.g.
+    ``merge_demographics`` for ``nics_demographics``) thus changes the
+    stage's key, not only a change to the stage function itself.
+    """
+    digest = hashlib.sha256()
+    for code in [func] + _package_modules(func):
+        try:
+            source = inspect.getsource(code)
+        except (OSError, TypeError):
+            source = repr(code.__code__.co_code)
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Run stages on demand, reusing cached outputs whose inputs are unchanged."""
+
+    def __init__(self, stages, cache_dir=PIPELINE_CACHE_DIR, tracer=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        # Times only by default; pass a Tracer with a path to keep a trace
+        self.tracer = Tracer() if tracer is None else tracer
+        self._keys = {}
+        self._values = {}
+        self._fingerprints_path = os.path.join(cache_dir, 'files.json')
+        self._fingerprints = {}
+        if os.path.exists(self._fingerprints_path):
+            with open(self._fingerprints_path) as f:
+                self._fingerprints = json.load(f)
+        # Names of the stages computed (rather than loaded) by this instance
+        self.computed = []
+
+    def _file_fingerprint(self, path):
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        known = self._fingerprints.get(os.path.abspath(path))
+        if known and known[:2] == signature:
+            return known[2]
+        digest = file_digest(path)
+        self._fingerprints[os.path.abspath(path)] = signature + [digest]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._fingerprints_path, 'w') as f:
+            json.dump(self._fingerprints, f, indent=2)
+        return digest
+
+    def key(self, name):
+        """Return the cache key of stage ``name``."""
+        if name not in self._keys:
+            stage = self.stages[name]
+            payload = {
+                'name': stage.name,
+                'version': stage.version,
+                'code': _code_digest(stage.func),
+                'params': stage.params,
+                'files': {param: self._file_fingerprint(stage.params[param]) for param in stage.files},
+                'deps': [self.key(dep) for dep in stage.deps],
+            }
+            encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+            self._keys[name] = hashlib.sha256(encoded).hexdigest()
+        return self._keys[name]
+
+    def path(self, name):
+        return os.path.join(self.cache_dir, '{}-{}.pkl'.format(name, self.key(name)[:24]))
+
+    def is_cached(self, name):
+        return os.path.exists(self.path(name))
+
+    def run(self, name):
+        """Return the output of stage ``name``, computing missing prerequisites."""
+        if name in self._values:
+            return self._values[name]
+        path = self.path(name)
+        if os.path.exists(path):
+            with self.tracer.stage(name, cached=True) as record:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                record['rows_out'] = row_count(value)
+        else:
+            stage = self.stages[name]
+            inputs = [self.run(dep) for dep in stage.deps]
+            with self.tracer.stage(name, inputs, cached=False) as record:
+                value = stage.func(*inputs, **stage.params)
+                record['rows_out'] = row_count(value)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self.computed.append(name)
+        self._values[name] = value
+        return value
+
+
+def _nics_clean(path):
+    return load_nics(path, cache_dir=None)
+
+
+def _monthly_cube(nics_clean):
+    return AggregateCube.from_frame(nics_clean, period='month')
+
+
+def _sql_monthly_cube(path, engine, cache_dir):
+    return aggregate_sql(path, period='month', engine=engine, cache_dir=cache_dir)
+
+
+def _yearly_cube(monthly_cube):
+    return monthly_cube.to_years()
+
+
+def _census_clean(path, facts):
+    return FactCatalog(pd.read_csv(path), facts).select()
+
+
+def _nics_demographics(yearly_cube, census_clean, years):
+    return merge_demographics(yearly_cube, census_clean, years)
+
+
+def _per_capita(yearly_cube, census_clean):
+    return per_capita_table(yearly_cube, population_table(census_clean))
+
+
+def _correlations(nics_demographics):
+    return correlation_table(nics_demographics)
+
+
+def _significance(nics_demographics, resamples, seed):
+    return significance_table(nics_demographics, resamples=resamples, seed=seed)
+
+
+def analysis_pipeline(nics_csv=NICS_CSV, census_csv=CENSUS_CSV, facts=None, years=(2010, 2016),
+                      resamples=10_000, seed=0, cache_dir=PIPELINE_CACHE_DIR, tracer=None, backend='pandas'):
+    """Return the notebook's wrangling and analysis steps as a ``Pipeline``.
+
+    ``backend`` selects how the monthly cube is aggregated: ``'pandas'``
+    from ``nics_clean``, or one of ``gun_checks.sql.SQL_ENGINES`` directly
+    from the csv (so ``nics_clean`` is never loaded for the aggregates).
+    sqlite's copy of the csv is kept in the ``sql`` subdirectory of
+    ``cache_dir``.
+    """
+    facts = CENSUS_FACTS if facts is None else facts
+    if backend == 'pandas':
+        monthly_cube = Stage('monthly_cube', _monthly_cube, deps=('nics_clean',))
+    else:
+        # The sqlite engine keeps its copy of the csv next to the stage outputs
+        params = {'path': nics_csv, 'engine': backend, 'cache_dir': os.path.join(cache_dir, 'sql')}
+        monthly_cube = Stage('monthly_cube', _sql_monthly_cube, params=params, files=('path',))
+    return Pipeline([
+        Stage('nics_clean', _nics_clean, params={'path': nics_csv}, files=('path',)),
+        monthly_cube,
+        Stage('yearly_cube', _yearly_cube, deps=('monthly_cube',)),
+        Stage('census_clean', _census_clean, params={'path': census_csv, 'facts': dict(facts)}, files=('path',)),
+        # Version 2: per-capita columns for every merged year (interpolated populations)
+        Stage('nics_demographics', _nics_demographics, deps=('yearly_cube', 'census_clean'),
+              params={'years': list(years)}, version=2),
+        Stage('per_capita', _per_capita, deps=('yearly_cube', 'census_clean')),
+        Stage('correlations', _correlations, deps=('nics_demographics',)),
+        Stage('significance', _significance, deps=('nics_demographics',),
+              params={'resamples': resamples, 'seed': seed}),
+    ], cache_dir=cache_dir, tracer=tracer)
@@ -0,0 +1,64 @@
+"""Yearly state populations interpolated between the census anchors.
+
+The census data only gives populations for 2010 and 2016, so per-capita
+checks used to exist for those two years alone. ``interpolate_population``
+fills in every other year by assuming a constant growth rate between
+neighbouring anchors (linear in log population) and extends the nearest
+segment's growth rate before the first and after the last anchor. All
+states and years are computed in one broadcast over a state x anchor array.
+Anchor years return the census value itself, so per-capita checks for 2010
+and 2016 are unchanged.
+"""
+
+import numpy as np
+import pandas as pd
+
+from gun_checks.census import population_table
+
+
+def interpolate_population(anchors, years):
+    """Return a state x year population frame for ``years``.
+
+    ``anchors`` is a state x year frame of known populations such as
+    ``gun_checks.census.population_table(census_clean)``. With a single
+    anchor year the population is held constant.
+    """
+    anchor_years = np.asarray(anchors.columns, dtype=np.float64)
+    order = np.argsort(anchor_years)
+    anchor_years = anchor_years[order]
+    population = anchors.to_numpy(dtype=np.float64)[:, order]
+    log_population = np.log(population)
+    years = np.asarray(list(years), dtype=np.int64)
+
+    if len(anchor_years) == 1:
+        values = np.repeat(population, len(years), axis=1)
+    else:
+        # Segment (pair of neighbouring anchors) used for each year
+        segment = np.clip(np.searchsorted(anchor_years, years, side='right') - 1, 0, len(anchor_years) - 2)
+        start, end = anchor_years[segment], anchor_years[segment + 1]
+        weight = (years - start) / (end - start)
+        low, high = log_population[:, segment], log_population[:, segment + 1]
+        values = np.exp(low + weight * (high - low))
+
+    # Anchor years keep their census value, even if a neighbouring anchor is missing
+    exact = np.isin(years, anchor_years)
+    values[:, exact] = population[:, np.searchsorted(anchor_years, years[exact])]
+    return pd.DataFrame(values, index=anchors.index, columns=pd.Index(years, name='year'))
+
+
+def population_panel(census_clean, years):
+    """Return census populations interpolated to every year in ``years``."""
+    return interpolate_population(population_table(census_clean), years)
+
+
+def per_capita_table(yearly, population, years=None):
+    """Return gun checks per capita as a state x year frame.
+
+    ``yearly`` is a yearly ``AggregateCube`` and ``population`` a state x
+    year frame of census anchors (see ``population_table``). ``years``
+    defaults to every year of the cube; populations are interpolated with
+    ``interpolate_population``.
+    """
+    years = list(yearly.periods if years is None else years)
+    checks = yearly.frame('totals').reindex(index=population.index, columns=years)
+    return checks / interpolate_population(population, years)
@@ -0,0 +1,155 @@
+"""Headless, parallel rendering of figure specs with content-hash caching.
+
+A ``FigureSpec`` names a plot ``kind`` (see ``PLOTTERS``), the data it
+draws and its options. ``render_figures`` draws every spec on the Agg
+backend in a process pool and writes one image per spec. The digest of each
+spec's data, options and dpi is kept in a manifest next to the images, and
+a figure whose digest has not changed since the last render is skipped.
+
+matplotlib and seaborn are only imported inside the worker processes, so
+rendering never changes the calling process's matplotlib backend.
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from gun_checks.trace import stop_tracing
+
+# Bump whenever a plotter changes so every figure is redrawn
+RENDER_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+FigureSpec = namedtuple('FigureSpec', ['name', 'kind', 'data', 'options'])
+
+
+def spec_digest(spec, dpi=100):
+    """Return a sha256 digest of a spec's kind, options and data and the ``dpi``."""
+    digest = hashlib.sha256()
+    header = {'version': RENDER_VERSION, 'kind': spec.kind, 'options': spec.options, 'dpi': dpi}
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode())
+    data = spec.data
+    if isinstance(data, pd.DataFrame):
+        digest.update(json.dumps([str(column) for column in data.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _line(plt, data, title=None, xlabel=None, ylabel=None, grid=False, figsize=(11.7, 8.27)):
+    fig, ax = plt.subplots(figsize=figsize)
+    data.plot(ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if grid:
+        ax.grid(True, which='both')
+    return fig
+
+
+def _hist(plt, data, figsize=(16, 16), layout=None, bins=10):
+    axes = data.hist(figsize=figsize, layout=layout, bins=bins)
+    return axes.ravel()[0].get_figure()
+
+
+def _bar(plt, data, layers, x='state', title=None, xlabel=None, ylabel=None, rotation=90,
+         figsize=(11.7, 8.27)):
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=figsize)
+    for layer in layers:
+        sns.barplot(data=data, x=x, ax=ax, **layer)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.tick_params(axis='x', labelrotation=rotation)
+    if any('label' in layer for layer in layers):
+        ax.legend()
+    return fig
+
+
+def _regplot(plt, data, layers, title=None, xlabel=None, ylabel=None, fontsize=15,
+             figsize=(11.7, 8.27)):
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=figsize)
+    for layer in layers:
+        sns.regplot(data=data, ax=ax, **layer)
+    ax.set_title(title, fontsize=fontsize)
+    ax.set_xlabel(xlabel, fontsize=fontsize)
+    ax.set_ylabel(ylabel, fontsize=fontsize)
+    ax.legend(fontsize=fontsize)
+    return fig
+
+
+PLOTTERS = {
+    'line': _line,
+    'hist': _hist,
+    'bar': _bar,
+    'regplot': _regplot,
+}
+
+
+def _draw(job):
+    """Draw one spec with pyplot's current backend, save it and close it."""
+    spec, path, dpi = job
+    import matplotlib.pyplot as plt
+
+    fig = PLOTTERS[spec.kind](plt, spec.data, **spec.options)
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return spec.name
+
+
+def _render(job):
+    """Draw one spec on the Agg backend; runs in a worker process only."""
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    return _draw(job)
+
+
+def render_figures(specs, out_dir='figures', processes=None, fmt='png', dpi=100):
+    """Render the specs whose data or options changed since the last run.
+
+    Returns ``(paths, rendered)``: the image path of every spec and the
+    names of the figures actually redrawn. Figures are drawn in worker
+    processes, so the caller's matplotlib backend (e.g. a notebook's) is
+    never switched. ``processes=0`` draws in the current process instead,
+    with its current backend, which is handy for debugging.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    paths = {}
+    digests = {}
+    jobs = []
+    for spec in specs:
+        path = os.path.join(out_dir, '{}.{}'.format(spec.name, fmt))
+        paths[spec.name] = path
+        digests[spec.name] = spec_digest(spec, dpi)
+        if manifest.get(spec.name) != digests[spec.name] or not os.path.exists(path):
+            jobs.append((spec, path, dpi))
+
+    if processes == 0:
+        rendered = [_draw(job) for job in jobs]
+    elif jobs:
+        workers = min(processes or os.cpu_count() or 1, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers, initializer=stop_tracing) as executor:
+            rendered = list(executor.map(_render, jobs))
+    else:
+        rendered = []
+
+    manifest.update({name: digests[name] for name in rendered})
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return paths, rendered
@@ -0,0 +1,171 @@
+"""HTML report built directly from computed tables and rendered figures.
+
+Exporting the notebook with nbconvert re-executes every cell. Here each
+report section is rendered from results that already exist, and each
+rendered section is cached on disk together with a digest of its inputs,
+so a rebuild only re-renders the sections whose tables, figures or text
+changed before stitching the page back together.
+"""
+
+import hashlib
+import html
+import json
+import os
+from collections import namedtuple
+from string import Template
+
+import pandas as pd
+
+from gun_checks.cache import file_digest
+
+# Bump whenever the section markup changes so every section is re-rendered
+REPORT_VERSION = 1
+
+Section = namedtuple('Section', ['name', 'title', 'text', 'tables', 'figures'])
+Section.__doc__ = """One report section.
+
+``tables`` is a list of ``(caption, DataFrame)`` pairs and ``figures`` a
+list of ``(caption, image path)`` pairs; either may be empty.
+"""
+
+PAGE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body {font-family: sans-serif; margin: 2em auto; max-width: 70em;}
+table {align: left; display: block; border-collapse: collapse; margin: 1em 0;}
+th, td {padding: .2em .6em; border-bottom: 1px solid #ddd; text-align: right;}
+figure {margin: 1em 0;}
+img {max-width: 100%;}
+</style>
+</head>
+<body>
+<h1>$title</h1>
+$sections
+</body>
+</html>
+""")
+
+
+def section_digest(section, base_dir):
+    """Return a sha256 digest of everything a section is rendered from."""
+    digest = hashlib.sha256()
+    header = [REPORT_VERSION, section.name, section.title, section.text,
+              [caption for caption, _ in section.tables],
+              [(caption, os.path.relpath(path, base_dir)) for caption, path in section.figures]]
+    digest.update(json.dumps(header).encode())
+    for _, table in section.tables:
+        digest.update(json.dumps([str(column) for column in table.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(table, index=True).to_numpy().tobytes())
+    for _, path in section.figures:
+        digest.update(file_digest(path).encode())
+    return digest.hexdigest()
+
+
+def render_section(section, base_dir):
+    """Return the HTML fragment for one section."""
+    parts = ['<section id="{}">'.format(html.escape(section.name)),
+             '<h2>{}</h2>'.format(html.escape(section.title))]
+    if section.text:
+        parts.append('<p>{}</p>'.format(html.escape(section.text)))
+    for caption, table in section.tables:
+        parts.append('<h3>{}</h3>'.format(html.escape(caption)))
+        parts.append(table.to_html(float_format=lambda value: '{:,.4g}'.format(value), border=0))
+    for caption, path in section.figures:
+        source = os.path.relpath(path, base_dir).replace(os.sep, '/')
+        parts.append('<figure><img src="{}" alt="{caption}"><figcaption>{caption}</figcaption></figure>'
+                     .format(html.escape(source), caption=html.escape(caption)))
+    parts.append('</section>')
+    return '\n'.join(parts)
+
+
+def build_report(sections, out_path='report/report.html', title='Influence of Demographic Variables on Gun Background Checks'):
+    """Write the report and return ``(out_path, names of re-rendered sections)``.
+
+    Rendered sections are cached in a ``sections`` directory next to
+    ``out_path`` and reused while their digest is unchanged.
+    """
+    base_dir = os.path.dirname(os.path.abspath(out_path))
+    section_dir = os.path.join(base_dir, 'sections')
+    os.makedirs(section_dir, exist_ok=True)
+
+    fragments = []
+    rendered = []
+    current = set()
+    for section in sections:
+        digest = section_digest(section, base_dir)
+        fragment_name = '{}-{}.html'.format(section.name, digest[:16])
+        fragment_path = os.path.join(section_dir, fragment_name)
+        current.add(fragment_name)
+        if os.path.exists(fragment_path):
+            with open(fragment_path) as f:
+                fragment = f.read()
+        else:
+            fragment = render_section(section, base_dir)
+            with open(fragment_path, 'w') as f:
+                f.write(fragment)
+            rendered.append(section.name)
+        fragments.append(fragment)
+
+    # Drop fragments of earlier versions of the sections
+    for name in os.listdir(section_dir):
+        if name not in current:
+            os.remove(os.path.join(section_dir, name))
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(PAGE.substitute(title=html.escape(title), sections='\n'.join(fragments)))
+    os.replace(tmp_path, out_path)
+    return out_path, rendered
+
+
+def _top_and_bottom(nics_demographics, feature, count=5):
+    columns = ['state', feature, 'gun_checks_per_capita_2010', 'gun_checks_per_capita_2016']
+    ranked = nics_demographics[columns].sort_values(feature, ascending=False)
+    return [('States with highest {}'.format(feature), ranked.head(count).reset_index(drop=True)),
+            ('States with lowest {}'.format(feature), ranked.tail(count)[::-1].reset_index(drop=True))]
+
+
+def notebook_sections(nics_clean, census_clean, nics_demographics, correlations, figure_paths):
+    """Return the report sections for the notebook's analysis.
+
+    ``correlations`` is ``correlation_table`` or ``significance_table``
+    output and ``figure_paths`` the paths returned by ``render_figures``
+    for ``gun_checks.figures.notebook_figures``.
+    """
+    def figures(*names):
+        return [(name.replace('_', ' ').capitalize(), figure_paths[name]) for name in names if name in figure_paths]
+
+    sections = [
+        Section('nics', 'NICS background checks',
+                'Summary statistics of the cleaned NICS data set.',
+                [('Summary statistics', nics_clean.describe())],
+                figures('nics_histograms')),
+        Section('trends', 'Annual and monthly trends', '', [],
+                figures('monthly_trends', 'monthly_1999_2000', 'monthly_2012', 'monthly_2015_2016',
+                        'annual_trends', 'annual_1999_2016')),
+        Section('census', 'Census data set',
+                'Summary statistics of the cleaned census data set.',
+                [('Summary statistics', census_clean.describe())],
+                figures('census_histograms')),
+        Section('correlations', 'Correlations with gun checks', '',
+                [('Correlation coefficients', correlations.sort_values(['feature', 'target'], ignore_index=True))],
+                []),
+    ]
+    for name, feature, figure_names in [
+            ('female_employment', 'female_employment_percentage',
+             ['female_employment_bar', 'female_employment_regplot']),
+            ('median_income', 'median_income', ['median_income_regplot']),
+            ('income_per_capita', 'income_per_capita', ['income_per_capita_bar', 'income_per_capita_regplot']),
+            ('senior_population', 'percent_over_65_2016', ['senior_population_bar', 'senior_population_regplot']),
+            ('education', 'bachelors_degree_percentage',
+             ['education_bar', 'hs_diploma_regplot', 'bachelors_degree_regplot']),
+            ('uninsured', 'uninsured_percentage', ['uninsured_bar', 'uninsured_regplot'])]:
+        sections.append(Section(
+            name, feature.replace('_', ' ').capitalize(), '',
+            _top_and_bottom(nics_demographics, feature),
+            figures(*figure_names),
+        ))
+    return sections
@@ -0,0 +1,95 @@
+"""Seasonal decomposition of many monthly series at once.
+
+``decompose`` performs a classical decomposition (centered moving average
+trend, per-calendar-month seasonal factors, residual) on a whole
+series x month matrix with array operations: the trend comes from one
+cumulative sum along the time axis and the seasonal factors from one
+matrix product with a month-of-year indicator matrix. The cost therefore
+grows with the size of the matrix, not with a Python loop over states, so
+thousands of series decompose as quickly as a few dozen.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Decomposition = namedtuple('Decomposition', ['observed', 'trend', 'seasonal', 'resid', 'factors'])
+Decomposition.__doc__ = """Parts of a decomposition; ``factors`` holds one seasonal factor per
+series and position in the cycle (calendar month)."""
+
+MODELS = ('additive', 'multiplicative')
+
+
+def centered_moving_average(values, period=12):
+    """Return the centered moving average of ``values`` along the last axis.
+
+    Even periods use the usual 2 x ``period`` average so the window stays
+    centered on a month. The first and last ``period // 2`` positions have
+    no complete window and are NaN. ``values`` must not contain NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    length = values.shape[-1]
+    half = period // 2
+    trend = np.full(values.shape, np.nan)
+    if length < period + (period % 2 == 0):
+        return trend
+    sums = np.cumsum(values, axis=-1)
+    sums = np.concatenate([np.zeros(values.shape[:-1] + (1,)), sums], axis=-1)
+    means = (sums[..., period:] - sums[..., :-period]) / period
+    if period % 2 == 0:
+        means = (means[..., :-1] + means[..., 1:]) / 2
+    trend[..., half:length - half] = means
+    return trend
+
+
+def decompose(values, phases, period=12, model='additive'):
+    """Decompose every row of the series x time matrix ``values``.
+
+    ``phases`` gives each column's position in the seasonal cycle
+    (``0 .. period - 1``, e.g. calendar month - 1). For the ``additive``
+    model ``observed = trend + seasonal + resid`` and the factors of each
+    series sum to zero; for the ``multiplicative`` model the parts multiply
+    and the factors average one. Returns a ``Decomposition`` of arrays.
+    """
+    if model not in MODELS:
+        raise ValueError('model must be one of {}'.format(MODELS))
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    phases = np.asarray(phases)
+    trend = centered_moving_average(values, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        detrended = values - trend if model == 'additive' else values / trend
+        known = np.isfinite(detrended)
+        # Average the detrended values of each phase with one matrix product
+        indicator = (phases[:, None] == np.arange(period)[None, :]).astype(np.float64)
+        factors = (np.where(known, detrended, 0.0) @ indicator) / (known @ indicator)
+        if model == 'additive':
+            factors = factors - factors.mean(axis=1, keepdims=True)
+            seasonal = factors[:, phases]
+            resid = values - trend - seasonal
+        else:
+            factors = factors / factors.mean(axis=1, keepdims=True)
+            seasonal = factors[:, phases]
+            resid = values / (trend * seasonal)
+    return Decomposition(values, trend, seasonal, resid, factors)
+
+
+def decompose_cube(cube, column='totals', model='additive', total='united states'):
+    """Decompose the monthly ``column`` of every state in a monthly cube.
+
+    A row labelled ``total`` holding the sum over all states is added (pass
+    ``total=None`` to leave it out). Returns a ``Decomposition`` of state x
+    month frames, with ``factors`` as a state x calendar month frame.
+    """
+    values = cube.column(column).astype(np.float64)
+    states = list(cube.states)
+    if total is not None:
+        values = np.vstack([values, values.sum(axis=0, keepdims=True)])
+        states.append(total)
+    index = pd.Index(states, name='state')
+    parts = decompose(values, np.asarray(cube.periods.month) - 1, 12, model)
+
+    frames = [pd.DataFrame(part, index=index, columns=cube.periods) for part in parts[:4]]
+    factors = pd.DataFrame(parts.factors, index=index, columns=pd.RangeIndex(1, 13, name='calendar_month'))
+    return Decomposition(*frames, factors)
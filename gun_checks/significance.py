@@ -0,0 +1,96 @@
+"""Bootstrap confidence intervals and permutation p-values for correlations.
+
+With only ~50 states a correlation coefficient on its own says little about
+whether a relationship is real. ``significance_table`` adds a bootstrap
+confidence interval and a two-sided permutation p-value to every row of
+``gun_checks.correlate.correlation_table``.
+
+Resamples are drawn as index matrices, so a batch of resamples for all
+features and targets is one fancy-indexing step followed by one batched
+``pearson_matrix`` call.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gun_checks.correlate import correlation_table, pearson_matrix, target_columns
+from gun_checks.trace import stop_tracing
+
+
+def _resample_batch(job):
+    """Run one batch of bootstrap and permutation resamples.
+
+    Returns the bootstrap correlations, shape ``(size, f, t)``, and the
+    number of permutations whose ``|r|`` reached the observed ``|r|``.
+    """
+    x, y, observed, size, seed = job
+    rng = np.random.default_rng(seed)
+    n = x.shape[0]
+
+    rows = rng.integers(0, n, size=(size, n))
+    bootstrap, _ = pearson_matrix(x[rows], y[rows])
+
+    permutations = np.argsort(rng.random((size, n)), axis=1)
+    permuted, _ = pearson_matrix(x[None], y[permutations])
+    with np.errstate(invalid='ignore'):
+        exceed = (np.abs(permuted) >= np.abs(observed) - 1e-12).sum(axis=0)
+    return bootstrap, exceed
+
+
+def resample_correlations(x, y, resamples=10_000, seed=0, batch_size=500, processes=None):
+    """Bootstrap and permute the correlations between columns of ``x`` and ``y``.
+
+    Returns ``(observed, bootstrap, p_values)`` where ``bootstrap`` has shape
+    ``(resamples, f, t)``. The work is split into batches of ``batch_size``
+    resamples, each with its own child seed, so results are identical
+    whether the batches run serially or in ``processes`` worker processes.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    observed, _ = pearson_matrix(x, y)
+
+    sizes = [batch_size] * (resamples // batch_size)
+    if resamples % batch_size:
+        sizes.append(resamples % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(x, y, observed, size, child) for size, child in zip(sizes, seeds)]
+
+    if processes:
+        with ProcessPoolExecutor(max_workers=processes, initializer=stop_tracing) as executor:
+            results = list(executor.map(_resample_batch, jobs))
+    else:
+        results = [_resample_batch(job) for job in jobs]
+
+    bootstrap = np.concatenate([batch for batch, _ in results])
+    exceed = sum(count for _, count in results)
+    p_values = (exceed + 1) / (resamples + 1)
+    p_values[np.isnan(observed)] = np.nan
+    return observed, bootstrap, p_values
+
+
+def significance_table(nics_demographics, features=None, resamples=10_000, confidence=0.95,
+                       seed=0, batch_size=500, processes=None):
+    """Return ``correlation_table`` with bootstrap intervals and p-values.
+
+    Adds ``ci_low`` / ``ci_high`` (percentile bootstrap interval at
+    ``confidence``) and ``p_value`` (two-sided permutation test) columns.
+    Pass ``processes`` to spread very large resample counts over a process
+    pool.
+    """
+    table = correlation_table(nics_demographics, features)
+    features = list(dict.fromkeys(table['feature']))
+    targets = [name for name, _, _ in target_columns(nics_demographics)]
+
+    _, bootstrap, p_values = resample_correlations(
+        nics_demographics[features].to_numpy(dtype=np.float64),
+        nics_demographics[targets].to_numpy(dtype=np.float64),
+        resamples=resamples, seed=seed, batch_size=batch_size, processes=processes,
+    )
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(bootstrap, [alpha, 1 - alpha], axis=0)
+
+    table['ci_low'] = low.ravel()
+    table['ci_high'] = high.ravel()
+    table['p_value'] = p_values.ravel()
+    return table
@@ -0,0 +1,133 @@
+"""SQL backends for the NICS state x period aggregation.
+
+``aggregate_sql`` computes the same ``AggregateCube`` as
+``AggregateCube.from_frame(load_nics(path))``, but as one ``GROUP BY``
+query run by an embedded database instead of on a materialized frame:
+
+- ``duckdb`` (optional dependency) streams gun_data.csv through the
+  aggregation on all cores (or ``threads``), holding only the groups in
+  memory.
+- ``sqlite`` (standard library) first copies the csv into an on-disk
+  database in chunks, cached next to the NICS cache and keyed on the csv's
+  sha256, then aggregates it out of core. SQLite runs each query on a
+  single thread.
+
+Only the grouped rows (one per state and period) are returned to pandas.
+"""
+
+import os
+import sqlite3
+
+import pandas as pd
+
+from gun_checks.cache import file_digest
+from gun_checks.cube import AggregateCube
+from gun_checks.nics import CACHE_DIR, NICS_CSV, NON_US_STATES
+from gun_checks.schema import COUNT_COLUMNS
+
+SQL_ENGINES = ('duckdb', 'sqlite')
+
+# Bump whenever the layout of the sqlite copy of the csv changes
+SQLITE_VERSION = 1
+
+PERIOD_EXPRESSIONS = {
+    'month': 'month',
+    'year': 'CAST(substr(month, 1, 4) AS INTEGER)',
+}
+
+
+def _quote(text):
+    return "'{}'".format(str(text).replace("'", "''"))
+
+
+def aggregate_query(source, period='month', columns=None):
+    """Return the SQL summing ``columns`` per state and ``period`` over ``source``.
+
+    The query filters out the non-state areas and lower cases state names,
+    like ``clean_nics``. Missing counts are skipped (and an all-missing
+    group sums to zero), as ``AggregateCube.from_frame`` does.
+    """
+    columns = COUNT_COLUMNS if columns is None else columns
+    sums = ',\n    '.join('CAST(COALESCE(SUM("{0}"), 0) AS BIGINT) AS "{0}"'.format(column)
+                           for column in columns)
+    return (
+        'SELECT\n    lower(state) AS state,\n    {period} AS {name},\n    {sums}\n'
+        'FROM {source}\n'
+        'WHERE state NOT IN ({excluded})\n'
+        'GROUP BY 1, 2'
+    ).format(period=PERIOD_EXPRESSIONS[period], name=period, sums=sums, source=source,
+             excluded=', '.join(_quote(state) for state in NON_US_STATES))
+
+
+def _duckdb_frame(path, period, columns, threads=None):
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("the duckdb backend needs the duckdb package; use engine='sqlite' "
+                          'or install duckdb') from None
+    types = {'month': 'VARCHAR', 'state': 'VARCHAR'}
+    types.update({column: 'DOUBLE' for column in COUNT_COLUMNS})
+    source = 'read_csv({}, header = true, columns = {{{}}})'.format(
+        _quote(path), ', '.join('{}: {}'.format(_quote(name), _quote(kind)) for name, kind in types.items()))
+    connection = duckdb.connect()
+    try:
+        if threads is not None:
+            connection.execute('SET threads TO {:d}'.format(threads))
+        return connection.execute(aggregate_query(source, period, columns)).df()
+    finally:
+        connection.close()
+
+
+def sqlite_path(path=NICS_CSV, cache_dir=CACHE_DIR):
+    """Return the sqlite copy of ``path`` for its current contents."""
+    name = 'nics-sqlite-v{}-{}.db'.format(SQLITE_VERSION, file_digest(path))
+    return os.path.join(cache_dir, name)
+
+
+def load_sqlite(path=NICS_CSV, cache_dir=CACHE_DIR, chunksize=100_000):
+    """Copy the NICS csv into an sqlite database (once) and return its path."""
+    db_path = sqlite_path(path, cache_dir)
+    if os.path.exists(db_path):
+        return db_path
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with pd.read_csv(path, chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk.to_sql('nics', connection, if_exists='append', index=False)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def _sqlite_frame(path, period, columns, cache_dir=CACHE_DIR):
+    connection = sqlite3.connect(load_sqlite(path, cache_dir))
+    try:
+        return pd.read_sql_query(aggregate_query('nics', period, columns), connection)
+    finally:
+        connection.close()
+
+
+def aggregate_sql(path=NICS_CSV, period='month', columns=None, engine='duckdb', threads=None,
+                  cache_dir=CACHE_DIR):
+    """Return the ``AggregateCube`` of ``path`` computed by an SQL ``engine``.
+
+    ``engine`` is one of :data:`SQL_ENGINES`. ``threads`` limits duckdb's
+    worker threads (default: one per core) and ``cache_dir`` holds sqlite's
+    copy of the csv.
+    """
+    if engine not in SQL_ENGINES:
+        raise ValueError('unknown SQL engine {!r}, expected one of {}'.format(engine, SQL_ENGINES))
+    columns = list(COUNT_COLUMNS if columns is None else columns)
+    if engine == 'duckdb':
+        grouped = _duckdb_frame(path, period, columns, threads)
+    else:
+        grouped = _sqlite_frame(path, period, columns, cache_dir)
+    if period == 'month':
+        grouped['month'] = pd.PeriodIndex(grouped['month'], freq='M')
+    return AggregateCube.from_frame(grouped, period=period, columns=columns)
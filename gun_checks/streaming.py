@@ -0,0 +1,57 @@
+"""Chunked NICS ingest that keeps only running per-group sums in memory.
+
+``load_nics`` materializes every row of gun_data.csv before grouping. The
+functions here read the csv ``chunksize`` rows at a time and fold each chunk
+into a state x month accumulator, so peak memory depends on the number of
+(state, month) groups rather than on the length of the file.
+"""
+
+import pandas as pd
+
+from gun_checks.nics import NICS_CSV, NON_US_STATES
+
+
+def stream_nics(path=NICS_CSV, chunksize=100_000, columns=('totals',)):
+    """Return summed ``columns`` per (state, month) without loading the csv.
+
+    The result is indexed like ``nics_clean.groupby(['state', 'month'])``:
+    lower case state names and monthly periods, with non-state areas
+    removed. Missing counts are skipped, as in ``load_nics``. Sums are
+    ``Int64`` so long histories cannot overflow the ``Int32`` count columns.
+    """
+    columns = list(columns)
+    state_month = None
+    reader = pd.read_csv(path, usecols=['month', 'state'] + columns, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[~chunk['state'].isin(NON_US_STATES)]
+        part = chunk[columns].astype('Int64').groupby([chunk['state'], chunk['month']]).sum()
+        if state_month is None:
+            state_month = part
+        else:
+            state_month = pd.concat([state_month, part]).groupby(level=[0, 1]).sum()
+
+    if state_month is None:
+        raise ValueError('{} contains no rows'.format(path))
+
+    # Only the (few) group labels need converting, not every row
+    state_month.index = pd.MultiIndex.from_arrays(
+        [state_month.index.get_level_values('state').str.lower(),
+         pd.to_datetime(state_month.index.get_level_values('month'), format='%Y-%m').to_period('M')],
+        names=['state', 'month'],
+    )
+    return state_month.sort_index()
+
+
+def fold_years(state_month):
+    """Collapse a state x month accumulator into a state x year one."""
+    months = state_month.index.get_level_values('month')
+    years = months.year.astype('int16').rename('year')
+    states = state_month.index.get_level_values('state')
+    return state_month.groupby([states, years]).sum()
+
+
+def permit_trends(state_month):
+    """Return ``(monthly_permit_trends, annual_permit_trends)`` for ``totals``."""
+    monthly_permit_trends = state_month['totals'].groupby(level='month').sum()
+    annual_permit_trends = fold_years(state_month)['totals'].groupby(level='year').sum()
+    return monthly_permit_trends, annual_permit_trends
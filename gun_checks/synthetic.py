@@ -0,0 +1,221 @@
+"""Synthetic NICS and census files for load testing.
+
+The generated files use exactly the layout of the shipped data, so every
+loader in the package reads them unchanged:
+
+- gun_data.csv: ``month``, ``state`` and the 25 count columns (see
+  ``gun_checks.schema.COUNT_COLUMNS``), newest month first, counts written
+  as ``123.0`` and ``multiple`` / ``totals`` as integers
+- US_Census_Data.csv: ``Fact``, ``Fact Note`` and one column per state,
+  with ``,``, ``%`` and ``$`` formatted values, a quoted FIPS code row, a
+  few value flags and the footnote rows found at the bottom of the real file
+
+Regions beyond the 55 NICS areas are copies of the 50 states ("Alabama 2",
+"Alabama 3", ...) that appear in both files, so the census merge keeps
+working at any size. Checks follow a per-region population, a yearly trend
+and a December / March seasonal peak. Columns NICS started collecting later
+are empty before ``REPORTED_SINCE`` and, for the ``returned_*`` and
+``rentals_*`` columns, sporadically empty afterwards. All values for a block
+of months are drawn as one (month, region, column) array.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from gun_checks.census import CENSUS_FACTS, CENSUS_MARKERS, POPULATION_FACTS
+from gun_checks.nics import NON_US_STATES
+from gun_checks.schema import COUNT_COLUMNS
+
+NICS_AREAS = [
+    'Alabama', 'Alaska', 'Arizona', 'Arkansas', 'California', 'Colorado', 'Connecticut', 'Delaware',
+    'District of Columbia', 'Florida', 'Georgia', 'Guam', 'Hawaii', 'Idaho', 'Illinois', 'Indiana',
+    'Iowa', 'Kansas', 'Kentucky', 'Louisiana', 'Maine', 'Mariana Islands', 'Maryland', 'Massachusetts',
+    'Michigan', 'Minnesota', 'Mississippi', 'Missouri', 'Montana', 'Nebraska', 'Nevada',
+    'New Hampshire', 'New Jersey', 'New Mexico', 'New York', 'North Carolina', 'North Dakota', 'Ohio',
+    'Oklahoma', 'Oregon', 'Pennsylvania', 'Puerto Rico', 'Rhode Island', 'South Carolina',
+    'South Dakota', 'Tennessee', 'Texas', 'Utah', 'Vermont', 'Virgin Islands', 'Virginia',
+    'Washington', 'West Virginia', 'Wisconsin', 'Wyoming',
+]
+
+# Approximate share of a month's checks falling in each count column
+COLUMN_SHARES = {
+    'permit': 0.25, 'permit_recheck': 0.02, 'handgun': 0.3, 'long_gun': 0.3, 'other': 0.01,
+    'multiple': 0.01, 'admin': 0.001,
+    'prepawn_handgun': 0.001, 'prepawn_long_gun': 0.002, 'prepawn_other': 0.0001,
+    'redemption_handgun': 0.02, 'redemption_long_gun': 0.03, 'redemption_other': 0.0005,
+    'returned_handgun': 0.001, 'returned_long_gun': 0.0005, 'returned_other': 0.0001,
+    'rentals_handgun': 0.0001, 'rentals_long_gun': 0.0001,
+    'private_sale_handgun': 0.003, 'private_sale_long_gun': 0.002, 'private_sale_other': 0.0002,
+    'return_to_seller_handgun': 0.0002, 'return_to_seller_long_gun': 0.0002,
+    'return_to_seller_other': 0.00005,
+}
+
+# Relative volume of checks in each calendar month (January first)
+SEASONALITY = np.array([1.0, 1.1, 1.2, 1.0, 0.9, 0.85, 0.85, 0.95, 1.0, 1.05, 1.2, 1.5])
+
+# First month in which a column was collected; earlier months are empty
+REPORTED_SINCE = {
+    'permit_recheck': '2016-08',
+    'returned_handgun': '2015-11', 'returned_long_gun': '2015-11', 'returned_other': '2015-11',
+    'rentals_handgun': '2015-11', 'rentals_long_gun': '2015-11',
+    'private_sale_handgun': '2014-09', 'private_sale_long_gun': '2014-09', 'private_sale_other': '2014-09',
+    'return_to_seller_handgun': '2014-09', 'return_to_seller_long_gun': '2014-09',
+    'return_to_seller_other': '2014-09',
+}
+
+# Share of state-months left empty in the sparsely reported columns
+SPORADIC_NULL_RATE = 0.05
+SPORADIC_NULL_PREFIXES = ('returned_', 'rentals_')
+
+# (low, high, unit) of each generated census fact; unit is 'count',
+# 'decimal', 'percent' or 'currency'
+CENSUS_RANGES = {
+    'percent_change_population': (-2.0, 12.0, 'percent'),
+    'percent_over_65_2016': (10.0, 20.0, 'percent'),
+    'percent_over_65_2010': (8.0, 18.0, 'percent'),
+    'hs_diploma_percentage': (80.0, 93.0, 'percent'),
+    'bachelors_degree_percentage': (18.0, 42.0, 'percent'),
+    'uninsured_percentage': (3.0, 20.0, 'percent'),
+    'total_employment_percentage': (55.0, 70.0, 'percent'),
+    'female_employment_percentage': (50.0, 66.0, 'percent'),
+    'median_income': (39_000, 75_000, 'currency'),
+    'income_per_capita': (21_000, 38_000, 'currency'),
+    'poverty_percentage': (7.0, 21.0, 'percent'),
+    'number_of_employers': (20_000, 900_000, 'count'),
+    'population_density': (1.0, 1_200.0, 'decimal'),
+    'land_area': (1_000.0, 600_000.0, 'decimal'),
+}
+
+# Share of census cells replaced by a value flag
+MARKER_RATE = 0.01
+
+# States whose percentages the census file writes as bare fractions ("0.151"
+# rather than "15.1%"): the 31st to 42nd state in alphabetical order
+FRACTION_STATES = [name for name in NICS_AREAS if name not in NON_US_STATES][30:42]
+
+CENSUS_FOOTNOTES = (
+    ['NOTE: FIPS Code values are enclosed in quotes to ensure leading zeros remain intact.',
+     'Value Notes', 'Fact Notes', '(a)', '(b)', '(c)', 'Value Flags'] + list(CENSUS_MARKERS))
+
+
+def region_names(regions=len(NICS_AREAS)):
+    """Return ``regions`` sorted area names: the NICS areas, then state copies."""
+    states = [name for name in NICS_AREAS if name not in NON_US_STATES]
+    copies = ['{} {}'.format(states[i % len(states)], 2 + i // len(states))
+              for i in range(max(regions - len(NICS_AREAS), 0))]
+    return sorted(NICS_AREAS[:regions] + copies)
+
+
+def region_populations(names, seed=0):
+    """Return a 2016 population per region (log-normal, like U.S. states)."""
+    rng = np.random.default_rng([seed, 0])
+    return pd.Series(np.round(rng.lognormal(15.0, 1.0, len(names))), index=names)
+
+
+def nics_block(months, names, population, seed=0, block=0):
+    """Return the NICS rows of ``months`` (newest first) for regions ``names``."""
+    rng = np.random.default_rng([seed, 1, block])
+    columns = list(COLUMN_SHARES)
+    years = months.year.to_numpy() - 2016
+
+    checks_per_person = np.random.default_rng([seed, 2]).lognormal(-6.5, 0.5, len(names))
+    level = (population.to_numpy() * checks_per_person)[None, :] * 1.06 ** years[:, None]
+    level = level * SEASONALITY[months.month.to_numpy() - 1][:, None]
+    level = level * rng.lognormal(0.0, 0.1, level.shape)
+    counts = rng.poisson(level[:, :, None] * np.array([COLUMN_SHARES[c] for c in columns])).astype(float)
+
+    ordinals = months.asi8
+    for position, column in enumerate(columns):
+        empty = np.zeros(counts.shape[:2], dtype=bool)
+        if column in REPORTED_SINCE:
+            empty |= (ordinals < pd.Period(REPORTED_SINCE[column], 'M').ordinal)[:, None]
+        if column.startswith(SPORADIC_NULL_PREFIXES):
+            empty |= rng.random(empty.shape) < SPORADIC_NULL_RATE
+        counts[:, :, position][empty] = np.nan
+
+    frame = pd.DataFrame(counts.reshape(-1, len(columns)), columns=columns)
+    frame.insert(0, 'month', np.repeat(months.strftime('%Y-%m').to_numpy(), len(names)))
+    frame.insert(1, 'state', np.tile(names, len(months)))
+    frame['multiple'] = frame['multiple'].astype('int64')
+    frame['totals'] = np.nansum(counts, axis=2).ravel().astype('int64')
+    return frame[['month', 'state'] + COUNT_COLUMNS]
+
+
+def write_nics(path, start='1998-11', end='2017-09', regions=len(NICS_AREAS), seed=0, block_months=12):
+    """Write a synthetic gun_data.csv covering ``start`` to ``end`` inclusive.
+
+    The defaults match the shipped file, whose first and last years are
+    partial. Rows are generated and appended ``block_months`` months at a
+    time, so memory stays flat however many months or regions are asked for.
+    """
+    names = region_names(regions)
+    population = region_populations(names, seed)
+    months = pd.period_range(start, end, freq='M')[::-1]
+    tmp_path = path + '.tmp'
+    for block, first in enumerate(range(0, len(months), block_months)):
+        frame = nics_block(months[first:first + block_months], names, population, seed, block)
+        frame.to_csv(tmp_path, index=False, header=block == 0, mode='w' if block == 0 else 'a')
+    os.replace(tmp_path, path)
+    return path
+
+
+def _format(values, unit):
+    if unit == 'percent':
+        return ['{:.1f}%'.format(value) for value in values]
+    if unit == 'currency':
+        return ['${:,.0f}'.format(value) for value in values]
+    if unit == 'decimal':
+        return ['{:,.1f}'.format(value) for value in values]
+    return ['{:,.0f}'.format(value) for value in values]
+
+
+def synthetic_census(regions=len(NICS_AREAS), seed=0):
+    """Return a synthetic US_Census_Data.csv frame (all cells as strings).
+
+    States are the non-territory regions of ``region_names(regions)`` in
+    census title case, and the facts are those of ``CENSUS_FACTS``.
+    Populations agree with the NICS generator and with the reported percent
+    change between 2010 and 2016.
+    """
+    rng = np.random.default_rng([seed, 3])
+    names = region_names(regions)
+    states = [name for name in names if name not in NON_US_STATES]
+    population_2016 = region_populations(names, seed)[states].to_numpy()
+
+    values = {key: rng.uniform(low, high, len(states)) for key, (low, high, _) in CENSUS_RANGES.items()}
+    values['population_2016'] = population_2016
+    values['population_2010'] = np.round(population_2016 / (1 + values['percent_change_population'] / 100))
+    units = {key: unit for key, (_, _, unit) in CENSUS_RANGES.items()}
+    units.update({key: 'count' for key in POPULATION_FACTS.values()})
+
+    fraction_states = np.isin([name.rstrip(' 0123456789') for name in states], FRACTION_STATES)
+    rows = []
+    for key, label in CENSUS_FACTS.items():
+        cells = np.array(_format(values[key], units[key]), dtype=object)
+        if units[key] == 'percent':
+            cells[fraction_states] = ['{:.3f}'.format(v) for v in values[key][fraction_states] / 100]
+        if key not in POPULATION_FACTS.values():
+            flagged = rng.random(len(states)) < MARKER_RATE
+            cells[flagged] = rng.choice(['Z', 'D', 'FN'], flagged.sum())
+        rows.append([label, None] + list(cells))
+    rows.append(['FIPS Code', None] + ['"{:02d}"'.format(code) for code in range(1, len(states) + 1)])
+    rows.extend([note, None] + [None] * len(states) for note in CENSUS_FOOTNOTES)
+    return pd.DataFrame(rows, columns=['Fact', 'Fact Note'] + states)
+
+
+def write_census(path, regions=len(NICS_AREAS), seed=0):
+    """Write a synthetic US_Census_Data.csv to ``path``."""
+    tmp_path = path + '.tmp'
+    synthetic_census(regions, seed).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_synthetic(out_dir, start='1998-11', end='2017-09', regions=len(NICS_AREAS), seed=0):
+    """Write matching gun_data.csv and US_Census_Data.csv files to ``out_dir``."""
+    os.makedirs(out_dir, exist_ok=True)
+    nics_path = write_nics(os.path.join(out_dir, 'gun_data.csv'), start, end, regions, seed)
+    census_path = write_census(os.path.join(out_dir, 'US_Census_Data.csv'), regions, seed)
+    return nics_path, census_path
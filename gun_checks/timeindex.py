@@ -0,0 +1,84 @@
+"""Time-window selection on NICS rows by binary search.
+
+``DataFrame.query('year >= "2012-01-01" & ...')`` parses an expression and
+compares every row. ``TimeIndexedNics`` sorts the rows once by (month,
+state) and keeps an integer month key (``year * 12 + month - 1``) per row,
+so any window of months is found with two ``searchsorted`` calls and
+returned as a contiguous slice of the sorted frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def month_key(value, end=False):
+    """Return the integer month key of ``value``.
+
+    ``value`` may be a string or Period of any frequency (``'2012'``,
+    ``'2012Q3'``, ``'2012-06'``, ``'2012-06-30'``), a Timestamp or date, or
+    an integer year. Integers are always years, never month keys. A value
+    spanning several months (a year or quarter) maps to its first month, or
+    to its last month when ``end`` is true.
+    """
+    if isinstance(value, (int, np.integer)):
+        return int(value) * 12 + (11 if end else 0)
+    if isinstance(value, (str, pd.Period)):
+        period = pd.Period(value).asfreq('M', 'end' if end else 'start')
+    else:
+        period = pd.Period(value, freq='M')
+    return period.year * 12 + period.month - 1
+
+
+class TimeIndexedNics:
+    """Cleaned NICS rows sorted by month and state with integer time keys.
+
+    Works with both the notebook's datetime ``month`` column and the
+    ``period[M]`` column produced by ``gun_checks.nics.load_nics``.
+    """
+
+    def __init__(self, nics):
+        months = nics['month']
+        keys = (months.dt.year.to_numpy(dtype=np.int32) * 12
+                + months.dt.month.to_numpy(dtype=np.int32) - 1)
+        state_codes = pd.factorize(nics['state'], sort=True)[0]
+        order = np.lexsort((state_codes, keys))
+        self.frame = nics.iloc[order].reset_index(drop=True)
+        self.month_keys = keys[order]
+        self.years = self.month_keys // 12
+
+    def window(self, start=None, end=None):
+        """Return the rows from month ``start`` to month ``end`` inclusive.
+
+        Bounds are anything :func:`month_key` accepts (so integers are
+        years; a year or quarter bound covers all of its months) or ``None``
+        for an open end. The result is a slice of the sorted frame.
+        """
+        first = 0 if start is None else np.searchsorted(self.month_keys, month_key(start), side='left')
+        last = (len(self.month_keys) if end is None
+                else np.searchsorted(self.month_keys, month_key(end, end=True), side='right'))
+        return self.frame.iloc[first:last]
+
+    def months_per_year(self):
+        """Return the number of distinct months collected in each year."""
+        years = np.unique(self.month_keys) // 12
+        counts = np.bincount(years - years[0])
+        index = pd.RangeIndex(years[0], years[0] + len(counts), name='year')
+        months = pd.Series(counts, index=index, name='months')
+        return months[months > 0]
+
+    def partial_years(self):
+        """Return the years with fewer than 12 months of data."""
+        months = self.months_per_year()
+        return months.index[months < 12].tolist()
+
+    def complete_years(self):
+        """Return the rows between the first and last year with all 12 months.
+
+        This drops the partial first and last years of the data set (Nov-Dec
+        1998 and Jan-Sep 2017 in the shipped csv).
+        """
+        months = self.months_per_year()
+        complete = months.index[months == 12]
+        if complete.empty:
+            return self.frame.iloc[0:0]
+        return self.window(int(complete[0]), int(complete[-1]))
@@ -0,0 +1,142 @@
+"""Per-stage timing and memory instrumentation.
+
+``Tracer.stage`` wraps one unit of work (a pipeline stage, figure
+rendering, the report build) and records its wall time, CPU time (of this
+process and, separately, of the worker processes it waited for), optionally
+its peak traced memory and the number of rows going in and out. Each record is
+appended to a JSON Lines file as soon as the stage finishes, so a slow or
+crashed run still leaves a trace, and ``format_summary`` lists the hot spots
+without attaching a profiler.
+
+Peak memory comes from ``tracemalloc``, which slows allocation-heavy code
+down several times over and would distort the timings, so it is opt-in
+(``memory=True``). It only covers this process: worker pools stop tracing in
+their workers (see ``stop_tracing``), whose memory is therefore not counted.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from gun_checks.cube import AggregateCube
+
+
+def row_count(value):
+    """Return the number of rows in ``value``, or None if it has no rows.
+
+    Frames, series and arrays count their first axis, a cube its
+    state x period cells and a tuple or list the rows of its items.
+    """
+    if isinstance(value, AggregateCube):
+        return int(value.values.shape[0] * value.values.shape[1])
+    if isinstance(value, (tuple, list)):
+        counts = [row_count(item) for item in value]
+        return sum(counts) if counts and None not in counts else None
+    if hasattr(value, 'shape') and len(getattr(value, 'shape')):
+        return int(value.shape[0])
+    return None
+
+
+def stop_tracing():
+    """Pool initializer: stop the tracemalloc tracing a forked worker inherits."""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _children_cpu():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+class Tracer:
+    """Collect per-stage records for one run and append them to ``path``."""
+
+    def __init__(self, path=None, memory=False):
+        self.path = path
+        self.memory = memory
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        # [memory at start, peak so far] of the stages currently open, innermost last
+        self._open = []
+
+    @contextmanager
+    def stage(self, name, inputs=None, **fields):
+        """Record the stage run inside the ``with`` block.
+
+        ``inputs`` are the stage's input objects (used for ``rows_in``);
+        extra keyword ``fields`` are stored with the record. The yielded
+        dict is the record itself: set ``record['rows_out']`` (for example
+        with ``row_count``) before the block ends.
+        """
+        record = {'run': self.run_id, 'stage': name,
+                  'started': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+                  'rows_in': None if inputs is None else row_count(list(inputs)), 'rows_out': None}
+        record.update(fields)
+
+        started_tracing = self.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open:
+                # reset_peak below would lose the enclosing stage's peak so far
+                self._open[-1][1] = max(self._open[-1][1], peak)
+            self._open.append([current, current])
+            tracemalloc.reset_peak()
+        wall, cpu, children = time.perf_counter(), time.process_time(), _children_cpu()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            # CPU of worker processes that exited (e.g. a process pool shut down) inside the stage
+            record['child_cpu_s'] = _children_cpu() - children
+            if self.memory:
+                start, seen = self._open.pop()
+                peak = max(tracemalloc.get_traced_memory()[1], seen)
+                record['peak_mib'] = (peak - start) / 2**20
+                if self._open:
+                    self._open[-1][1] = max(self._open[-1][1], peak)
+                if started_tracing:
+                    tracemalloc.stop()
+            self._write(record)
+
+    def _write(self, record):
+        self.records.append(record)
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+    def summary(self, top=5):
+        return format_summary(self.records, top)
+
+
+def read_trace(path, run=None):
+    """Return the records of ``path``, only those of ``run`` if given."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if run is None or record['run'] == run]
+
+
+def format_summary(records, top=5):
+    """Return the ``top`` slowest records as a text table."""
+    total = sum(record['wall_s'] for record in records) or 1.0
+    lines = ['{:<28} {:>9} {:>9} {:>9} {:>9} {:>10} {:>10} {:>6}'.format(
+        'stage', 'wall s', 'cpu s', 'child s', 'peak MiB', 'rows in', 'rows out', 'share')]
+    for record in sorted(records, key=lambda record: record['wall_s'], reverse=True)[:top]:
+        name = record['stage'] + (' (cached)' if record.get('cached') else '')
+        peak = record.get('peak_mib')
+        lines.append('{:<28} {:9.3f} {:9.3f} {:9.3f} {:>9} {:>10} {:>10} {:5.0%}'.format(
+            name, record['wall_s'], record['cpu_s'], record.get('child_cpu_s', 0.0),
+            '-' if peak is None else '{:.1f}'.format(peak),
+            '-' if record['rows_in'] is None else record['rows_in'],
+            '-' if record['rows_out'] is None else record['rows_out'], record['wall_s'] / total))
+    return '\n'.join(lines)
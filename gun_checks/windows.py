@@ -0,0 +1,201 @@
+"""Rolling and expanding window statistics of monthly check series.
+
+A window spec pairs a statistic with a window length in months, e.g.
+``sum:3``, ``mean:12`` or ``ratio:12`` (the month against the same month a
+year earlier); without a length (``max``) the window is expanding, from the
+first month up to the current one.
+
+``window_stats`` computes any number of specs for a whole series x month
+matrix from a single cumulative sum: the sum over the ``w`` months ending at
+``t`` is ``C[t] - C[t - w]``, so every rolling sum and mean, whatever its
+length, is one subtraction of two columns of ``C``. The counts are integers,
+so these differences are exact.
+
+``WindowStats`` keeps the same statistics up to date as months are
+appended: it holds the last few cumulative sums per series in a ring buffer
+plus the running expanding maxima and minima, so appending a month costs
+O(series x specs) however long the history is.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+WindowSpec = namedtuple('WindowSpec', ['stat', 'months'])
+WindowSpec.__doc__ = """A statistic over the last ``months`` months (None: all months so far)."""
+
+# Statistics available for rolling windows and for expanding windows
+ROLLING_STATS = ('sum', 'mean', 'ratio')
+EXPANDING_STATS = ('sum', 'mean', 'max', 'min')
+
+DEFAULT_SPECS = ('sum:3', 'sum:6', 'sum:12', 'mean:3', 'mean:6', 'mean:12', 'ratio:12', 'max')
+
+
+def parse_spec(spec):
+    """Return ``spec`` (a ``WindowSpec`` or text like ``'mean:12'``) as a ``WindowSpec``."""
+    if isinstance(spec, WindowSpec):
+        stat, months = spec
+    else:
+        stat, _, months = str(spec).partition(':')
+        months = int(months) if months else None
+    if months is None:
+        if stat not in EXPANDING_STATS:
+            raise ValueError('expanding windows support {}, not {!r}'.format(EXPANDING_STATS, stat))
+    elif stat not in ROLLING_STATS:
+        raise ValueError('rolling windows support {}, not {!r}'.format(ROLLING_STATS, stat))
+    elif months < 1:
+        raise ValueError('window length must be at least one month, got {}'.format(months))
+    return WindowSpec(stat, months)
+
+
+def spec_name(spec):
+    """Return the column name of ``spec``, e.g. ``sum_3`` or ``expanding_max``."""
+    stat, months = parse_spec(spec)
+    return 'expanding_' + stat if months is None else '{}_{}'.format(stat, months)
+
+
+def _depth(specs):
+    """Return how many past cumulative sums ``specs`` need, including the current one."""
+    depth = 2
+    for stat, months in specs:
+        if months is not None:
+            # A ratio needs the single month ``months`` ago: two cumulative sums
+            depth = max(depth, months + 2 if stat == 'ratio' else months + 1)
+    return depth
+
+
+def window_stats(values, specs=DEFAULT_SPECS):
+    """Return every spec of ``specs`` for each month of a series x month matrix.
+
+    The result maps each :func:`spec_name` to an array shaped like
+    ``values``. Months without a complete rolling window are NaN.
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    specs = [parse_spec(spec) for spec in specs]
+    length = values.shape[1]
+    sums = np.zeros((values.shape[0], length + 1))
+    np.cumsum(values, axis=1, out=sums[:, 1:])
+
+    stats = {}
+    for spec in specs:
+        stat, months = spec
+        result = np.full(values.shape, np.nan)
+        if months is None:
+            if stat == 'sum':
+                result = sums[:, 1:].copy()
+            elif stat == 'mean':
+                result = sums[:, 1:] / np.arange(1, length + 1)
+            else:
+                result = getattr(np, 'maximum' if stat == 'max' else 'minimum').accumulate(values, axis=1)
+        elif stat == 'ratio':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[:, months:] = values[:, months:] / values[:, :-months]
+        elif length >= months:
+            result[:, months - 1:] = sums[:, months:] - sums[:, :length + 1 - months]
+            if stat == 'mean':
+                result[:, months - 1:] /= months
+        stats[spec_name(spec)] = result
+    return stats
+
+
+def cube_series(cube, columns=('totals',)):
+    """Return the (state, column) series of a monthly cube as ``(index, matrix)``."""
+    columns = list(columns)
+    selected = cube.select(columns=columns).values
+    index = pd.MultiIndex.from_product([cube.states, columns], names=['state', 'column'])
+    matrix = np.moveaxis(selected, 2, 1).reshape(len(index), len(cube.periods))
+    return index, matrix.astype(np.float64)
+
+
+def cube_window_stats(cube, columns=('totals',), specs=DEFAULT_SPECS):
+    """Return window statistics of ``columns`` for every state and month of ``cube``.
+
+    One row per state and month, one column per count column and spec,
+    named like ``totals_sum_12``.
+    """
+    columns = list(columns)
+    index, matrix = cube_series(cube, columns)
+    stats = window_stats(matrix, specs)
+    rows = pd.MultiIndex.from_product([cube.states, cube.periods])
+    result = {}
+    for position, column in enumerate(columns):
+        for name, values in stats.items():
+            result['{}_{}'.format(column, name)] = values[position::len(columns)].ravel()
+    return pd.DataFrame(result, index=rows)
+
+
+class WindowStats:
+    """Window statistics of many series, updated one appended month at a time."""
+
+    def __init__(self, series, specs=DEFAULT_SPECS):
+        self.series = pd.Index(series)
+        self.specs = [parse_spec(spec) for spec in specs]
+        self.depth = _depth(self.specs)
+        size = len(self.series)
+        # sums[:, t % depth] holds the cumulative sum up to and including month t;
+        # slots not yet written stand for the (zero) sum before the first month
+        self.sums = np.zeros((size, self.depth))
+        self.maximum = np.full(size, -np.inf)
+        self.minimum = np.full(size, np.inf)
+        self.count = 0
+
+    @classmethod
+    def from_matrix(cls, series, values, specs=DEFAULT_SPECS):
+        """Return a ``WindowStats`` that has seen every month of ``values``."""
+        stats = cls(series, specs)
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        length = values.shape[1]
+        if length:
+            sums = np.cumsum(values, axis=1)
+            months = np.arange(max(length - stats.depth, 0), length)
+            stats.sums[:, months % stats.depth] = sums[:, months]
+            stats.maximum = values.max(axis=1)
+            stats.minimum = values.min(axis=1)
+            stats.count = length
+        return stats
+
+    @classmethod
+    def from_cube(cls, cube, columns=('totals',), specs=DEFAULT_SPECS):
+        """Return a ``WindowStats`` of ``columns`` that has seen every month of ``cube``."""
+        index, matrix = cube_series(cube, columns)
+        return cls.from_matrix(index, matrix, specs)
+
+    def _sum_before(self, months):
+        """Cumulative sum up to ``months`` months before the newest month."""
+        return self.sums[:, (self.count - 1 - months) % self.depth]
+
+    def append(self, values):
+        """Add one month (a value per series) and return its statistics.
+
+        Returns a dict mapping each :func:`spec_name` to one value per
+        series, NaN while a rolling window is incomplete.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        current = self._sum_before(0) + values if self.count else values.copy()
+        self.count += 1
+        self.sums[:, (self.count - 1) % self.depth] = current
+        np.maximum(self.maximum, values, out=self.maximum)
+        np.minimum(self.minimum, values, out=self.minimum)
+
+        stats = {}
+        for spec in self.specs:
+            stat, months = spec
+            if months is None:
+                result = {'sum': current, 'mean': current / self.count,
+                          'max': self.maximum, 'min': self.minimum}[stat].copy()
+            elif stat == 'ratio':
+                if self.count > months:
+                    past = self._sum_before(months) - self._sum_before(months + 1)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        result = values / past
+                else:
+                    result = np.full(len(values), np.nan)
+            elif self.count >= months:
+                result = current - self._sum_before(months)
+                if stat == 'mean':
+                    result = result / months
+            else:
+                result = np.full(len(values), np.nan)
+            stats[spec_name(spec)] = result
+        return stats